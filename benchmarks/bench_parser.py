@@ -0,0 +1,195 @@
+"""
+Micro-benchmarks du parser IDFM (IDFMTrafficParser et décodage progressif).
+
+Les données sont générées (taille réaliste et taille de stress) pour
+mesurer le coût de parsing d'un rafraîchissement, en opérations par seconde
+et en allocations mémoire par opération.
+
+Usage (depuis la racine du dépôt, dans l'environnement de développement
+Home Assistant) :
+
+    python benchmarks/bench_parser.py                  # comparer à la référence
+    python benchmarks/bench_parser.py --save-baseline  # enregistrer la référence
+    python benchmarks/bench_parser.py --only departures
+
+Le script échoue (code 1) si un cas est plus lent que la référence, ou
+alloue plus de mémoire, au-delà du seuil de régression (--threshold).
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import json
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import (  # noqa: E402
+    make_departures,
+    make_departures_document,
+    make_disruptions,
+    make_network_reports,
+)
+from custom_components.idfm_trafic.idfm_api import IDFMTrafficParser  # noqa: E402
+from custom_components.idfm_trafic.streaming import JSONArrayStream  # noqa: E402
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25  # 25 % plus lent (ou plus d'allocations) = régression
+MIN_DURATION = 0.5  # secondes de mesure minimum par cas
+
+
+def _cold(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Exécuter `func` avec le cache de perturbations vidé à chaque appel."""
+    def run() -> Any:
+        IDFMTrafficParser._disruption_cache.clear()
+        return func()
+    return run
+
+
+def _stream(document: str, chunk_size: int = 16384) -> Callable[[], Any]:
+    """Décoder un document par morceaux, comme à la réception."""
+    chunks = [document[i:i + chunk_size] for i in range(0, len(document), chunk_size)]
+
+    def run() -> Any:
+        array = JSONArrayStream("departures", 10, ("stop_date_time", "display_informations"))
+        for chunk in chunks:
+            array.feed(chunk)
+            if array.done:
+                break
+        return array.items
+    return run
+
+
+def build_cases() -> dict[str, Callable[[], Any]]:
+    """Cas de mesure, par nom."""
+    line_ids = [f"line:IDFM:C0{1371 + index}" for index in range(60)]
+    realistic = {"disruptions": make_disruptions(20, line_ids[:1])}
+    stress = {"disruptions": make_disruptions(500, line_ids)}
+    network = make_network_reports(make_disruptions(500, line_ids), line_ids)
+    stop_area_ids = [f"stop_area:IDFM:{70000 + index}" for index in range(1000)]
+    network_with_stops = make_network_reports(
+        make_disruptions(500, line_ids, stop_area_ids=stop_area_ids), line_ids
+    )
+    departures_10 = make_departures(10)
+    departures_2000 = make_departures(2000)
+    parsed_2000 = IDFMTrafficParser.parse_departures(departures_2000)
+    document = make_departures_document(2000)
+
+    return {
+        "line_reports_20_cold": _cold(lambda: IDFMTrafficParser.parse_line_reports(realistic)),
+        "line_reports_500_cold": _cold(lambda: IDFMTrafficParser.parse_line_reports(stress)),
+        "line_reports_500_warm": lambda: IDFMTrafficParser.parse_line_reports(stress),
+        "split_line_reports_500x60": lambda: IDFMTrafficParser.split_line_reports(network, line_ids),
+        "index_stop_areas_500x100": lambda: IDFMTrafficParser.index_stop_area_disruptions(
+            network_with_stops, stop_area_ids[:100]
+        ),
+        "departures_10": lambda: IDFMTrafficParser.parse_departures(departures_10),
+        "departures_2000": lambda: IDFMTrafficParser.parse_departures(departures_2000),
+        "refresh_departures_2000": lambda: IDFMTrafficParser.refresh_departures(parsed_2000),
+        "group_departures_2000": lambda: IDFMTrafficParser.group_departures(parsed_2000, 10),
+        "stream_departures_10_of_2000": _stream(document),
+    }
+
+
+def measure(func: Callable[[], Any]) -> dict[str, float]:
+    """Mesurer les opérations par seconde et les allocations d'un cas."""
+    func()  # échauffement (et remplissage du cache pour les cas « warm »)
+
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < MIN_DURATION:
+        func()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0
+    )
+
+    return {
+        "ops_per_sec": iterations / elapsed,
+        "peak_kib": peak / 1024,
+        "retained_kib": allocated / 1024,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Lister les régressions par rapport à la référence."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['ops_per_sec']:.0f} ops/s "
+                f"(référence {reference['ops_per_sec']:.0f})"
+            )
+        if result["peak_kib"] > reference["peak_kib"] * (1 + threshold) + 1:
+            regressions.append(
+                f"{name}: pic mémoire {result['peak_kib']:.0f} KiB "
+                f"(référence {reference['peak_kib']:.0f})"
+            )
+    return regressions
+
+
+def main() -> int:
+    """Point d'entrée."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save-baseline", action="store_true", help="enregistrer la référence")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--only", help="ne lancer que les cas contenant ce texte")
+    args = parser.parse_args()
+
+    cases = build_cases()
+    if args.only:
+        cases = {name: func for name, func in cases.items() if args.only in name}
+
+    results = {}
+    print(f"{'cas':<32}{'ops/s':>12}{'pic KiB':>12}{'retenu KiB':>12}")
+    for name, func in cases.items():
+        results[name] = measure(func)
+        result = results[name]
+        print(
+            f"{name:<32}{result['ops_per_sec']:>12.1f}"
+            f"{result['peak_kib']:>12.1f}{result['retained_kib']:>12.1f}"
+        )
+
+    if args.save_baseline:
+        baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+        baseline.update(
+            {name: {key: round(value, 1) for key, value in result.items()} for name, result in results.items()}
+        )
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Référence enregistrée dans {BASELINE_FILE}")
+        return 0
+
+    if not BASELINE_FILE.exists():
+        print("Pas de référence : lancer avec --save-baseline")
+        return 0
+
+    regressions = compare(results, json.loads(BASELINE_FILE.read_text()), args.threshold)
+    for regression in regressions:
+        print(f"RÉGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
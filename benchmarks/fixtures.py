@@ -0,0 +1,126 @@
+"""Génération de réponses de l'API Navitia PRIM (benchmarks et serveur de substitution)."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import json
+import random
+from typing import Any
+
+SEED = 20260211
+
+_SEVERITY_EFFECTS = ("NO_SERVICE", "SIGNIFICANT_DELAYS", "DETOUR", "OTHER_EFFECT", "UNKNOWN_EFFECT")
+_STATIONS = ("Châtelet", "Auber", "Nation", "La Défense", "Gare du Nord", "Denfert-Rochereau")
+
+
+def _html_message(rng: random.Random, paragraphs: int) -> str:
+    """Message HTML chargé, comme ceux des canaux moteur/email de PRIM."""
+    parts = []
+    for _ in range(paragraphs):
+        station = rng.choice(_STATIONS)
+        parts.append(
+            f"<p><strong>Motif&nbsp;:</strong> incident technique à {station}.</p>"
+            f"<p>Le trafic est <b>interrompu</b> entre {station} et "
+            f"{rng.choice(_STATIONS)}&nbsp;; reprise estimée vers "
+            f"{rng.randint(5, 23)}h{rng.randint(0, 59):02d}.<br/>"
+            "<a href=\"https://www.iledefrance-mobilites.fr\">Plus d&#39;infos</a></p>"
+        )
+    return "".join(parts)
+
+
+def make_disruptions(
+    count: int,
+    line_ids: list[str],
+    seed: int = SEED,
+    stop_area_ids: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """Générer `count` perturbations au format Navitia (stations impactées si `stop_area_ids`)."""
+    rng = random.Random(seed)
+    disruptions = []
+    for index in range(count):
+        line_id = rng.choice(line_ids)
+        tags = ["Ascenseur"] if rng.random() < 0.1 else []
+        disruption = {
+            "id": f"disruption-{index}",
+            "status": "active" if rng.random() < 0.85 else "future",
+            "updated_at": f"20260211T{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}00",
+            "severity": {"effect": rng.choice(_SEVERITY_EFFECTS)},
+            "category": "Incidents",
+            "cause": "perturbation",
+            "tags": tags,
+            "messages": [
+                {"channel": {"name": "titre"}, "text": f"Trafic perturbé ligne {index % 20}"},
+                {"channel": {"name": "moteur"}, "text": _html_message(rng, rng.randint(2, 6))},
+                {"channel": {"name": "email"}, "text": _html_message(rng, 3)},
+            ],
+            "impacted_objects": [
+                {"pt_object": {"id": line_id, "embedded_type": "line"}},
+                {"pt_object": {"line_section": {"line": {"id": rng.choice(line_ids)}}}},
+            ],
+        }
+        if stop_area_ids:
+            # Station fermée, ou arrêts d'un tronçon interrompu
+            disruption["impacted_objects"].append({
+                "pt_object": {"id": rng.choice(stop_area_ids), "embedded_type": "stop_area"},
+                "impacted_stops": [
+                    {"stop_point": {"stop_area": {"id": rng.choice(stop_area_ids)}}}
+                    for _ in range(rng.randint(0, 3))
+                ],
+            })
+        disruptions.append(disruption)
+    return disruptions
+
+
+def make_network_reports(disruptions: list[dict[str, Any]], line_ids: list[str]) -> dict[str, Any]:
+    """Réponse line_reports du réseau entier pour des perturbations données."""
+    return {
+        "line_reports": [
+            {
+                "line": {
+                    "id": line_id,
+                    "links": [
+                        {"type": "disruption", "id": disruption["id"]}
+                        for disruption in disruptions[index::len(line_ids)]
+                    ],
+                },
+                "pt_objects": [],
+            }
+            for index, line_id in enumerate(line_ids)
+        ],
+        "disruptions": disruptions,
+    }
+
+
+def make_departures(count: int, seed: int = SEED) -> dict[str, Any]:
+    """Générer une réponse de départs (champs conservés par le client uniquement)."""
+    rng = random.Random(seed)
+    start = datetime.now() + timedelta(minutes=1)
+    departures = []
+    for index in range(count):
+        departure = start + timedelta(seconds=index * 30 + rng.randint(0, 29))
+        code = rng.choice(("A", "B", "1", "4", "14", "T3a"))
+        departures.append({
+            "stop_date_time": {
+                "departure_date_time": departure.strftime("%Y%m%dT%H%M%S"),
+                "base_departure_date_time": departure.strftime("%Y%m%dT%H%M%S"),
+                "departure_platform": str(rng.randint(1, 4)),
+            },
+            "display_informations": {
+                "label": code,
+                "code": code,
+                "direction": f"{rng.choice(_STATIONS)} (Paris)",
+                "headsign": f"{code}{rng.randint(100, 999)}",
+                "network": "RATP",
+            },
+        })
+    return {"departures": departures}
+
+
+def make_departures_document(count: int) -> str:
+    """Document JSON complet de départs, tel que reçu de l'API (avec le reste de la réponse)."""
+    data = make_departures(count)
+    for departure in data["departures"]:
+        departure["route"] = {"id": "route:IDFM:1", "name": "x" * 200, "links": [{"id": "a"}] * 5}
+        departure["links"] = [{"type": "line", "id": "line:IDFM:C01742"}] * 3
+    data["pagination"] = {"total_result": count}
+    data["disruptions"] = make_disruptions(50, ["line:IDFM:C01742"])
+    return json.dumps(data)
@@ -0,0 +1,438 @@
+"""
+Serveur de substitution local de l'API Navitia PRIM (enregistrement / rejeu).
+
+Sert les requêtes de l'intégration sans accès à PRIM, pour les tests de
+charge et de pannes :
+
+- rejoue les réponses enregistrées dans un dossier (--recordings) ;
+- en mode --record, relaie vers PRIM les requêtes inconnues et les enregistre ;
+- sinon, génère des réponses pour un réseau synthétique de taille
+  quelconque (--lines, --stations, --disruptions) ;
+- injecte à la demande de la latence, des 429, des 5xx et des timeouts.
+
+Usage (depuis la racine du dépôt) :
+
+    python benchmarks/prim_standin.py --lines 300 --stations 1000 --latency 0.05
+    python benchmarks/prim_standin.py --record --api-key $PRIM_KEY --recordings recordings/
+
+Puis, dans les options avancées de l'intégration, régler l'URL de l'API
+sur http://127.0.0.1:8080 (n'importe quelle API key est acceptée).
+
+Les pannes se règlent aussi pendant l'exécution, et les compteurs se
+lisent sur /_stats :
+
+    curl -X POST 127.0.0.1:8080/_control -d '{"rate_5xx": 0.5, "latency": 1}'
+    curl 127.0.0.1:8080/_stats
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+from pathlib import Path
+import random
+import re
+import sys
+import time
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+import zlib
+
+from aiohttp import ClientSession, ClientTimeout, web
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import make_departures, make_disruptions  # noqa: E402
+
+PRIM_BASE_URL = "https://prim.iledefrance-mobilites.fr/marketplace/v2/navitia"
+# Taille de page maximale acceptée (au-delà, le paramètre count est plafonné)
+PAGE_SIZE_LIMIT = 1000
+_COMMERCIAL_MODES = (
+    ("commercial_mode:Metro", "Métro"),
+    ("commercial_mode:RapidTransit", "RER"),
+    ("commercial_mode:LocalTrain", "Transilien"),
+    ("commercial_mode:Tramway", "Tramway"),
+    ("commercial_mode:Bus", "Bus"),
+)
+
+
+@dataclass
+class Faults:
+    """Pannes injectées (taux entre 0 et 1, durées en secondes)."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    rate_timeout: float = 0.0
+    timeout_delay: float = 15.0
+    retry_after: int = 30
+
+    def draw(self, rng: random.Random) -> str | None:
+        """Tirer la panne à appliquer à une requête (None si aucune)."""
+        roll = rng.random()
+        for fault, rate in (
+            ("timeout", self.rate_timeout),
+            ("429", self.rate_429),
+            ("5xx", self.rate_5xx),
+        ):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+class SyntheticNetwork:
+    """Réseau synthétique : lignes, stations et perturbations générées."""
+
+    def __init__(self, lines: int, stations: int, disruptions: int) -> None:
+        """Générer le réseau."""
+        self.lines = [
+            {
+                "id": f"line:IDFM:C{index:05d}",
+                "code": str(index + 1),
+                "name": f"Ligne {index + 1}",
+                "color": f"{zlib.crc32(str(index).encode()) & 0xFFFFFF:06X}",
+                "commercial_mode": dict(
+                    zip(("id", "name"), _COMMERCIAL_MODES[index % len(_COMMERCIAL_MODES)])
+                ),
+            }
+            for index in range(lines)
+        ]
+        self.stop_areas = [
+            {
+                "id": f"stop_area:IDFM:{70000 + index}",
+                "name": f"Station {index}",
+                "label": f"Station {index} (Commune {index % 50})",
+                "lines": [self.lines[(index + offset) % lines] for offset in range(3)]
+                if lines
+                else [],
+            }
+            for index in range(stations)
+        ]
+        line_ids = [line["id"] for line in self.lines]
+        self.disruptions = (
+            make_disruptions(
+                disruptions,
+                line_ids,
+                stop_area_ids=[stop_area["id"] for stop_area in self.stop_areas],
+            )
+            if line_ids
+            else []
+        )
+        self._by_line: dict[str, list[dict[str, Any]]] = {}
+        for disruption in self.disruptions:
+            for impacted in disruption["impacted_objects"]:
+                line_id = impacted["pt_object"].get("id")
+                if line_id and line_id.startswith("line:"):
+                    self._by_line.setdefault(line_id, []).append(disruption)
+
+    def line_reports(
+        self, line_ids: list[str] | None, query: dict[str, str] | None = None
+    ) -> dict[str, Any]:
+        """Réponse line_reports pour des lignes (toutes si None, paginée)."""
+        wanted = [line["id"] for line in self.lines] if line_ids is None else line_ids
+        disruptions: dict[str, dict[str, Any]] = {}
+        reports = []
+        for line_id in wanted:
+            line_disruptions = self._by_line.get(line_id, [])
+            if not line_disruptions:
+                continue
+            disruptions.update((d["id"], d) for d in line_disruptions)
+            reports.append({
+                "line": {
+                    "id": line_id,
+                    "links": [{"type": "disruption", "id": d["id"]} for d in line_disruptions],
+                },
+                "pt_objects": [],
+            })
+        if query is None:
+            return {"line_reports": reports, "disruptions": list(disruptions.values())}
+        result = self.page("line_reports", reports, query)
+        linked = {
+            link["id"] for report in result["line_reports"] for link in report["line"]["links"]
+        }
+        result["disruptions"] = [d for d in disruptions.values() if d["id"] in linked]
+        return result
+
+    def traffic_reports(self, stop_area_id: str) -> dict[str, Any]:
+        """Réponse traffic_reports d'une station (perturbations de ses lignes)."""
+        stop_area = self._stop_area(stop_area_id)
+        lines = stop_area["lines"] if stop_area else []
+        disruptions = [d for line in lines for d in self._by_line.get(line["id"], [])]
+        return {
+            "traffic_reports": [{
+                "stop_areas": [{
+                    "id": stop_area_id,
+                    "links": [{"type": "disruption", "id": d["id"]} for d in disruptions],
+                }],
+            }] if disruptions else [],
+            "disruptions": disruptions,
+        }
+
+    def places(self, query: str) -> dict[str, Any]:
+        """Réponse places : stations dont le nom contient la recherche."""
+        query = query.lower()
+        return {
+            "places": [
+                {"id": s["id"], "name": s["label"], "embedded_type": "stop_area"}
+                for s in self.stop_areas
+                if query in s["label"].lower()
+            ][:10]
+        }
+
+    def _stop_area(self, stop_area_id: str) -> dict[str, Any] | None:
+        """Station du réseau synthétique (None si inconnue, pour tester la validation)."""
+        match = re.fullmatch(r"stop_area:IDFM:(\d+)", stop_area_id)
+        if match is None:
+            return None
+        index = int(match.group(1)) - 70000
+        if 0 <= index < len(self.stop_areas):
+            return self.stop_areas[index]
+        return None
+
+    def stop_area(self, stop_area_id: str) -> dict[str, Any] | None:
+        """Réponse stop_areas/{id}."""
+        stop_area = self._stop_area(stop_area_id)
+        return {"stop_areas": [stop_area]} if stop_area else None
+
+    def line(self, line_id: str) -> dict[str, Any] | None:
+        """Réponse lines/{id} (générée pour une ligne hors du réseau synthétique)."""
+        if not line_id.startswith("line:"):
+            return None
+        line = next((line for line in self.lines if line["id"] == line_id), None)
+        if line is None:
+            line = {
+                "id": line_id,
+                "code": line_id.rsplit(":", 1)[-1],
+                "name": line_id,
+                "color": "000000",
+                "commercial_mode": dict(zip(("id", "name"), _COMMERCIAL_MODES[0])),
+            }
+        return {"lines": [line]}
+
+    @staticmethod
+    def page(key: str, items: list[dict[str, Any]], query: dict[str, str]) -> dict[str, Any]:
+        """Réponse paginée (stop_areas, lines), taille de page plafonnée comme PRIM."""
+        count = min(int(query.get("count", 25)), PAGE_SIZE_LIMIT)
+        start_page = int(query.get("start_page", 0))
+        return {
+            key: items[start_page * count:(start_page + 1) * count],
+            "pagination": {
+                "total_result": len(items),
+                "start_page": start_page,
+                "items_per_page": count,
+            },
+        }
+
+    def departures(self, stop_area_id: str, query: dict[str, str]) -> dict[str, Any]:
+        """Réponse departures (différente par station, recalculée à chaque appel)."""
+        count = int(query.get("count", 10))
+        return make_departures(count, seed=zlib.crc32(stop_area_id.encode()))
+
+
+class StandInServer:
+    """Serveur aiohttp de substitution de l'API PRIM."""
+
+    def __init__(
+        self,
+        network: SyntheticNetwork,
+        faults: Faults,
+        recordings: Path | None = None,
+        upstream_key: str | None = None,
+        seed: int = 0,
+    ) -> None:
+        """Initialisation du serveur."""
+        self.network = network
+        self.faults = faults
+        self.recordings = recordings
+        self.upstream_key = upstream_key
+        self.stats: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._started = time.monotonic()
+        self._session: ClientSession | None = None
+        self._routes = (
+            (re.compile(r"/line_reports/lines/([^/]+)/line_reports"),
+             lambda m, q: network.line_reports([m.group(1)])),
+            (re.compile(r"/coverage/fr-idf/line_reports"),
+             lambda m, q: network.line_reports(None, q)),
+            (re.compile(r"(?:/coverage/fr-idf)?/(?:stop_areas|stop_points)/([^/]+)"
+                        r"(?:/(?:lines|physical_modes)/[^/]+)?/departures"),
+             lambda m, q: network.departures(m.group(1), q)),
+            (re.compile(r"/traffic_reports/([^/]+)"),
+             lambda m, q: network.traffic_reports(m.group(1))),
+            (re.compile(r"/coverage/fr-idf/places"),
+             lambda m, q: network.places(q.get("q", ""))),
+            (re.compile(r"/coverage/fr-idf/stop_areas"),
+             lambda m, q: network.page("stop_areas", network.stop_areas, q)),
+            (re.compile(r"/coverage/fr-idf/stop_areas/([^/]+)"),
+             lambda m, q: network.stop_area(m.group(1))),
+            (re.compile(r"/coverage/fr-idf/lines"),
+             lambda m, q: network.page("lines", network.lines, q)),
+            (re.compile(r"/coverage/fr-idf/lines/([^/]+)"),
+             lambda m, q: network.line(m.group(1))),
+        )
+
+    def app(self) -> web.Application:
+        """Application aiohttp."""
+        app = web.Application()
+        app.router.add_get("/_stats", self._handle_stats)
+        app.router.add_post("/_control", self._handle_control)
+        app.router.add_get("/{tail:.*}", self._handle_api)
+        app.on_cleanup.append(self._close)
+        return app
+
+    async def _close(self, app: web.Application) -> None:
+        """Fermer la session vers PRIM."""
+        if self._session is not None:
+            await self._session.close()
+
+    @staticmethod
+    def _request_key(path: str, query: dict[str, str]) -> str:
+        """Clé d'une requête (chemin et paramètres triés)."""
+        return f"{path}?{urlencode(sorted(query.items()))}"
+
+    def _recording_file(self, key: str) -> Path | None:
+        """Fichier d'enregistrement d'une requête."""
+        if self.recordings is None:
+            return None
+        return self.recordings / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        """Compteurs de requêtes et débit moyen."""
+        elapsed = time.monotonic() - self._started
+        return web.json_response({
+            **self.stats,
+            "elapsed": round(elapsed, 1),
+            "requests_per_second": round(self.stats["requests"] / elapsed, 2) if elapsed else 0,
+            "faults": asdict(self.faults),
+        })
+
+    async def _handle_control(self, request: web.Request) -> web.Response:
+        """Modifier les pannes injectées ({"rate_5xx": 0.5, ...})."""
+        changes = await request.json()
+        for name, value in changes.items():
+            if not hasattr(self.faults, name):
+                raise web.HTTPBadRequest(text=f"Paramètre inconnu: {name}")
+            setattr(self.faults, name, type(getattr(self.faults, name))(value))
+        if changes.get("reset_stats"):
+            self.stats.clear()
+            self._started = time.monotonic()
+        return web.json_response(asdict(self.faults))
+
+    async def _handle_api(self, request: web.Request) -> web.StreamResponse:
+        """Répondre à une requête de l'API."""
+        self.stats["requests"] += 1
+        faults = self.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(max(0.0, faults.latency + self._rng.uniform(-1, 1) * faults.jitter))
+
+        fault = faults.draw(self._rng)
+        if fault is not None:
+            self.stats[f"fault_{fault}"] += 1
+        if fault == "timeout":
+            await asyncio.sleep(faults.timeout_delay)
+            return web.Response(status=504)
+        if fault == "429":
+            return web.json_response(
+                {"message": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": str(faults.retry_after)},
+            )
+        if fault == "5xx":
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+
+        query = dict(parse_qsl(request.query_string, keep_blank_values=True))
+        body = await self._body(request.path, query)
+        if body is None:
+            self.stats["not_found"] += 1
+            return web.json_response(
+                {"error": {"id": "unknown_object", "message": request.path}}, status=404
+            )
+
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.stats["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        self.stats["ok"] += 1
+        response = web.Response(
+            body=body, content_type="application/json", headers={"ETag": etag}
+        )
+        response.enable_compression()
+        return response
+
+    async def _body(self, path: str, query: dict[str, str]) -> bytes | None:
+        """Corps de la réponse : enregistrement, relais vers PRIM ou réseau synthétique."""
+        key = self._request_key(path, query)
+        recording = self._recording_file(key)
+        if recording is not None and recording.exists():
+            self.stats["replayed"] += 1
+            return json.dumps(json.loads(recording.read_text())["body"]).encode()
+
+        if self.upstream_key is not None and recording is not None:
+            data = await self._fetch_upstream(path, query)
+            if data is not None:
+                self.stats["recorded"] += 1
+                recording.write_text(json.dumps({"request": key, "body": data}))
+                return json.dumps(data).encode()
+
+        for pattern, build in self._routes:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                data = build(match, query)
+                return None if data is None else json.dumps(data).encode()
+        return None
+
+    async def _fetch_upstream(self, path: str, query: dict[str, str]) -> dict[str, Any] | None:
+        """Relayer une requête vers PRIM."""
+        if self._session is None:
+            self._session = ClientSession(timeout=ClientTimeout(total=30))
+        async with self._session.get(
+            f"{PRIM_BASE_URL}{path}",
+            params=query,
+            headers={"apiKey": self.upstream_key, "Accept": "application/json"},
+        ) as response:
+            if response.status != 200:
+                return None
+            return await response.json()
+
+
+def main() -> None:
+    """Point d'entrée."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lines", type=int, default=60, help="lignes du réseau synthétique")
+    parser.add_argument("--stations", type=int, default=500, help="stations du réseau synthétique")
+    parser.add_argument("--disruptions", type=int, default=100, help="perturbations actives")
+    parser.add_argument("--recordings", type=Path, help="dossier des réponses enregistrées")
+    parser.add_argument("--record", action="store_true", help="relayer et enregistrer les requêtes inconnues")
+    parser.add_argument("--api-key", help="API key PRIM pour --record")
+    parser.add_argument("--seed", type=int, default=0, help="graine du tirage des pannes")
+    for field, default in asdict(Faults()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    if args.record and (args.recordings is None or args.api_key is None):
+        parser.error("--record nécessite --recordings et --api-key")
+    if args.recordings is not None:
+        args.recordings.mkdir(parents=True, exist_ok=True)
+
+    faults = Faults(**{field: getattr(args, field) for field in asdict(Faults())})
+    server = StandInServer(
+        SyntheticNetwork(args.lines, args.stations, args.disruptions),
+        faults,
+        args.recordings,
+        args.api_key if args.record else None,
+        args.seed,
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
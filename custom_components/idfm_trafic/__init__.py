@@ -4,16 +4,33 @@ Infos trafic et prochains départs pour Métro, RER, Train et Tram d'Île-de-Fra
 """
 from __future__ import annotations
 
+import hashlib
 import logging
-from datetime import timedelta
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
+from .const import (
+    API_BASE_URL,
+    CONF_BASE_URL,
+    DATA_CLIENTS,
+    DATA_QUOTA_STORE,
+    DATA_QUOTA_USAGE,
+    DATA_RATE_LIMITERS,
+    DEFAULT_DAILY_QUOTA,
+    DEFAULT_REQUESTS_PER_SECOND,
+    DOMAIN,
+    QUOTA_STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .coordinator import IDFMDataUpdateCoordinator, async_remove_cache
 from .idfm_api import IDFMApiClient
+from .rate_limiter import PRIMRateLimiter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,19 +41,19 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Configuration de l'intégration IDFM Trafic."""
     hass.data.setdefault(DOMAIN, {})
     
-    api_key = entry.data["api_key"]
-    client = IDFMApiClient(api_key)
+    # Décompte du quota journalier enregistré (avant la création du client)
+    await async_load_quota(hass)
     
-    # Coordinateur pour les mises à jour
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=DOMAIN,
-        update_method=client.async_get_all_data,
-        update_interval=timedelta(seconds=60),
+    api_key = entry.data["api_key"]
+    client = async_acquire_client(
+        hass, api_key, entry.entry_id, entry.data.get(CONF_BASE_URL, API_BASE_URL)
     )
     
-    await coordinator.async_config_entry_first_refresh()
+    # Coordinateur pour les mises à jour (un seul lot de requêtes par cycle)
+    coordinator = IDFMDataUpdateCoordinator(hass, client, entry)
+    
+    # Dernières données connues servies tout de suite, si disponibles
+    await coordinator.async_load_cache()
     
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
@@ -45,6 +62,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
+    # Premier chargement en arrière-plan : l'installation n'attend pas l'API
+    entry.async_create_background_task(
+        hass, coordinator.async_initial_refresh(), f"{DOMAIN}_refresh_{entry.entry_id}"
+    )
+    
+    # Compte à rebours des départs recalculé localement entre deux requêtes
+    entry.async_on_unload(coordinator.async_start_countdown())
+    
     # Écouter les changements d'options
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     
@@ -61,6 +86,122 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        # Le client de l'entrée (l'URL de l'API a pu changer dans les options)
+        client = hass.data[DOMAIN].pop(entry.entry_id)["client"]
+        await async_release_client(
+            hass, client.api_key, entry.entry_id, client.base_url
+        )
     
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Suppression de l'intégration : effacer les données persistées."""
+    await async_remove_cache(hass, entry.entry_id)
+
+
+def _client_key(api_key: str, base_url: str) -> str:
+    """Clé du registre des clients (la clé API seule pour l'API PRIM)."""
+    base_url = base_url.rstrip("/")
+    return api_key if base_url == API_BASE_URL else f"{api_key}@{base_url}"
+
+
+def _quota_key(client_key: str) -> str:
+    """Identifiant d'une clé API dans le fichier du quota (jamais la clé en clair)."""
+    return hashlib.sha256(client_key.encode()).hexdigest()[:16]
+
+
+async def async_load_quota(hass: HomeAssistant) -> None:
+    """Charger une fois le décompte du quota journalier enregistré par clé API."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_QUOTA_STORE in domain_data:
+        return
+
+    store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, QUOTA_STORAGE_KEY)
+    domain_data[DATA_QUOTA_STORE] = store
+    stored = await store.async_load() or {}
+
+    # Un limiteur créé pendant le chargement garde son décompte s'il est plus haut
+    for key, limiter in domain_data.get(DATA_RATE_LIMITERS, {}).items():
+        if isinstance(stored.get(_quota_key(key)), dict):
+            limiter.restore(stored[_quota_key(key)])
+    domain_data[DATA_QUOTA_USAGE] = stored
+
+
+@callback
+def _async_get_rate_limiter(hass: HomeAssistant, key: str) -> PRIMRateLimiter:
+    """
+    Obtenir le limiteur d'une clé API.
+
+    Le limiteur est gardé dans hass.data : il survit à la fermeture du client
+    (rechargement d'une entrée, changement d'options) et son décompte du jour
+    est enregistré sur disque pour survivre aux redémarrages.
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    limiters: dict[str, PRIMRateLimiter] = domain_data.setdefault(DATA_RATE_LIMITERS, {})
+    if key in limiters:
+        return limiters[key]
+
+    limiter = PRIMRateLimiter(DEFAULT_REQUESTS_PER_SECOND, DEFAULT_DAILY_QUOTA)
+    limiters[key] = limiter
+    stored = domain_data.get(DATA_QUOTA_USAGE, {}).get(_quota_key(key))
+    if isinstance(stored, dict):
+        limiter.restore(stored)
+
+    store: Store[dict[str, Any]] | None = domain_data.get(DATA_QUOTA_STORE)
+    if store is not None:
+
+        def _data() -> dict[str, Any]:
+            # Les clés des entrées pas encore chargées sont conservées
+            usage = domain_data.setdefault(DATA_QUOTA_USAGE, {})
+            usage.update({_quota_key(k): lim.usage for k, lim in limiters.items()})
+            return usage
+
+        limiter.on_usage = lambda: store.async_delay_save(_data, STORAGE_SAVE_DELAY)
+
+    return limiter
+
+
+@callback
+def async_acquire_client(
+    hass: HomeAssistant, api_key: str, entry_id: str, base_url: str = API_BASE_URL
+) -> IDFMApiClient:
+    """
+    Obtenir le client partagé pour une clé API.
+
+    Un seul client (et donc un seul cache de requêtes) est créé par clé API
+    et par URL d'API, sur la session HTTP gérée par Home Assistant, et
+    référencé par chaque entrée qui l'utilise.
+    """
+    clients = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_CLIENTS, {})
+    key = _client_key(api_key, base_url)
+
+    if key not in clients:
+        clients[key] = {
+            "client": IDFMApiClient(
+                api_key,
+                session=async_get_clientsession(hass),
+                base_url=base_url,
+                rate_limiter=_async_get_rate_limiter(hass, key),
+            ),
+            "entries": set(),
+        }
+
+    clients[key]["entries"].add(entry_id)
+    return clients[key]["client"]
+
+
+async def async_release_client(
+    hass: HomeAssistant, api_key: str, entry_id: str, base_url: str = API_BASE_URL
+) -> None:
+    """Libérer la référence d'une entrée et fermer le client s'il n'est plus utilisé."""
+    clients = hass.data.get(DOMAIN, {}).get(DATA_CLIENTS, {})
+    key = _client_key(api_key, base_url)
+    shared = clients.get(key)
+    if shared is None:
+        return
+
+    shared["entries"].discard(entry_id)
+    if not shared["entries"]:
+        clients.pop(key)
+        await shared["client"].close()
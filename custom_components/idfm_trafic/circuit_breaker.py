@@ -0,0 +1,135 @@
+"""Disjoncteurs pour les requêtes vers l'API PRIM."""
+from __future__ import annotations
+
+import logging
+import random
+import time
+
+from .const import (
+    BREAKER_BACKOFF_JITTER,
+    BREAKER_BASE_BACKOFF,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_MAX_BACKOFF,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Types d'erreurs des requêtes
+ERROR_AUTH = "auth"  # 401 / 403 : API key refusée
+ERROR_QUOTA = "quota"  # 429 ou quota local épuisé
+ERROR_SERVER = "server"  # 5xx ou réponse illisible
+ERROR_TIMEOUT = "timeout"
+ERROR_NETWORK = "network"
+ERROR_CLIENT = "client"  # autre 4xx (ex: objet inconnu)
+
+# Erreurs qui signalent une panne de l'API (et non un problème de la requête)
+OUTAGE_ERRORS = frozenset({ERROR_AUTH, ERROR_SERVER, ERROR_TIMEOUT, ERROR_NETWORK})
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def error_for_status(status: int) -> str:
+    """Type d'erreur d'une réponse HTTP en échec."""
+    if status in (401, 403):
+        return ERROR_AUTH
+    if status == 429:
+        return ERROR_QUOTA
+    if status >= 500:
+        return ERROR_SERVER
+    return ERROR_CLIENT
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur d'une famille de requêtes (ex: départs, infos trafic).
+
+    - Fermé : les requêtes passent ; après `BREAKER_FAILURE_THRESHOLD`
+      pannes consécutives (ou une seule erreur d'authentification), il s'ouvre.
+    - Ouvert : aucune requête n'est envoyée pendant un délai qui double à
+      chaque réouverture (avec une part aléatoire), jusqu'à
+      `BREAKER_MAX_BACKOFF`.
+    - Semi-ouvert : à l'expiration du délai, une seule requête d'essai passe ;
+      son succès referme le disjoncteur, son échec le rouvre.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialisation du disjoncteur."""
+        self.name = name
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.last_error: str | None = None
+        self._openings = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def retry_in(self) -> float:
+        """Durée (secondes) avant la prochaine requête d'essai."""
+        if self.state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._open_until - time.monotonic())
+
+    def allow(self) -> bool:
+        """Indiquer si une requête peut être envoyée (et réserver l'essai)."""
+        if self.state == STATE_OPEN and time.monotonic() >= self._open_until:
+            self.state = STATE_HALF_OPEN
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        """Libérer l'essai en cours sans verdict (requête annulée ou refusée localement)."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Enregistrer une requête réussie."""
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("API IDFM (%s) de nouveau disponible", self.name)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._openings = 0
+        self._probing = False
+
+    def record_failure(self, error: str) -> None:
+        """Enregistrer une panne et ouvrir le disjoncteur si nécessaire."""
+        self.failures += 1
+        self.last_error = error
+        self._probing = False
+        if (
+            self.state == STATE_HALF_OPEN
+            or error == ERROR_AUTH
+            or self.failures >= BREAKER_FAILURE_THRESHOLD
+        ):
+            self._open(error)
+
+    def _open(self, error: str) -> None:
+        """Ouvrir le disjoncteur pour un délai exponentiel avec gigue."""
+        if error == ERROR_AUTH:
+            backoff = BREAKER_MAX_BACKOFF
+        else:
+            backoff = min(BREAKER_MAX_BACKOFF, BREAKER_BASE_BACKOFF * 2**self._openings)
+        backoff *= 1 - BREAKER_BACKOFF_JITTER * random.random()
+        self._openings += 1
+        self._open_until = time.monotonic() + backoff
+        if self.state == STATE_CLOSED:
+            _LOGGER.warning(
+                "API IDFM (%s) indisponible après %d échec(s) (%s), "
+                "requêtes suspendues pendant %.0f s",
+                self.name,
+                self.failures,
+                error,
+                backoff,
+            )
+        else:
+            _LOGGER.debug(
+                "API IDFM (%s) toujours indisponible (%s), nouvel essai dans %.0f s",
+                self.name,
+                error,
+                backoff,
+            )
+        self.state = STATE_OPEN
@@ -9,14 +9,85 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import homeassistant.helpers.config_validation as cv
 
-from .const import CONF_API_KEY, CONF_LINES, CONF_STATIONS, DOMAIN, LINES
+from .const import (
+    API_BASE_URL,
+    CONF_API_KEY,
+    CONF_BASE_URL,
+    CONF_LINES,
+    CONF_MAX_ATTRIBUTE_ITEMS,
+    CONF_STATION_FILTERS,
+    CONF_STATION_INFO,
+    CONF_STATIONS,
+    DATA_CLIENTS,
+    DATA_VALID_API_KEYS,
+    DEFAULT_MAX_ATTRIBUTE_ITEMS,
+    DOMAIN,
+    FILTER_COUNT,
+    FILTER_DIRECTIONS,
+    FILTER_DURATION,
+    FILTER_LINES,
+    FILTER_PHYSICAL_MODES,
+    FILTER_REALTIME,
+    FILTER_SPLIT,
+    FILTER_STOP_POINT,
+    MAX_DEPARTURES_COUNT,
+    PHYSICAL_MODES,
+    SELECTABLE_LINE_TYPES,
+    STOP_AREA_SEARCH_LIMIT,
+)
+from .circuit_breaker import ERROR_AUTH
 from .idfm_api import IDFMApiClient
+from .lines import async_get_line_catalog
+from .stop_areas import StopAreaInfo, async_get_stop_area_index, async_resolve_stop_areas
 
 _LOGGER = logging.getLogger(__name__)
 
 
+async def _async_validate_api_key(
+    hass: HomeAssistant, client: IDFMApiClient
+) -> str | None:
+    """
+    Vérifier une API key, sans requête si elle est déjà connue comme valide.
+
+    Returns:
+        None si la clé est valide, sinon le type d'erreur (voir
+        IDFMApiClient.async_check_api_key)
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    valid_keys: set[tuple[str, str]] = domain_data.setdefault(DATA_VALID_API_KEYS, set())
+    key = (client.api_key, client.base_url)
+    # Une clé utilisée par une entrée chargée est valide
+    if key in valid_keys or any(
+        (shared["client"].api_key, shared["client"].base_url) == key
+        for shared in domain_data.get(DATA_CLIENTS, {}).values()
+    ):
+        return None
+    error = await client.async_check_api_key()
+    if error is None:
+        valid_keys.add(key)
+    return error
+
+
+def _parse_station_ids(stations_input: str) -> list[str]:
+    """Parser les IDs de stations (séparés par des virgules)."""
+    return list(dict.fromkeys(s.strip() for s in stations_input.split(",") if s.strip()))
+
+
+def _station_info_data(stations: dict[str, StopAreaInfo]) -> dict[str, dict[str, Any]]:
+    """Noms et lignes (codes et IDs) des stations vérifiées, pour entry.data."""
+    return {
+        station_id: {
+            "name": info.name,
+            "lines": list(info.lines),
+            "line_ids": list(info.line_ids),
+        }
+        for station_id, info in stations.items()
+    }
+
+
 class IDFMTraficConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Configuration flow pour IDFM Trafic."""
 
@@ -25,8 +96,11 @@ class IDFMTraficConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         """Initialisation du flow."""
         self._api_key: str | None = None
+        self._base_url = API_BASE_URL
         self._selected_lines: list[str] = []
         self._selected_stations: list[str] = []
+        self._search_results: dict[str, str] = {}
+        self._api_client: IDFMApiClient | None = None
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -36,29 +110,35 @@ class IDFMTraficConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
             api_key = user_input[CONF_API_KEY]
+            base_url = user_input.get(CONF_BASE_URL, API_BASE_URL)
             
-            # Vérifier l'API key
-            client = IDFMApiClient(api_key)
+            # Vérifier l'API key (sur la session HTTP partagée de Home Assistant)
+            client = IDFMApiClient(
+                api_key, session=async_get_clientsession(self.hass), base_url=base_url
+            )
             try:
-                # Test avec une requête simple (RER A par exemple)
-                test_data = await client.async_get_line_traffic("line:IDFM:C01742")
-                await client.close()
-                
-                if test_data is not None:
+                error = await _async_validate_api_key(self.hass, client)
+                if error is None:
                     self._api_key = api_key
+                    self._base_url = base_url
+                    self._api_client = client
                     return await self.async_step_select_lines()
-                else:
-                    errors["base"] = "invalid_api_key"
+                # Seul un refus de la clé la rend invalide ; le reste est une panne
+                errors["base"] = (
+                    "invalid_api_key" if error == ERROR_AUTH else "cannot_connect"
+                )
             except Exception as e:
                 _LOGGER.error("Erreur lors de la validation de l'API key: %s", e)
                 errors["base"] = "cannot_connect"
-                await client.close()
+
+        schema = {vol.Required(CONF_API_KEY): str}
+        if self.show_advanced_options:
+            # URL de l'API (ex: serveur de substitution local pour les tests)
+            schema[vol.Optional(CONF_BASE_URL, default=API_BASE_URL)] = cv.url
 
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema({
-                vol.Required(CONF_API_KEY): str,
-            }),
+            data_schema=vol.Schema(schema),
             errors=errors,
         )
 
@@ -66,62 +146,131 @@ class IDFMTraficConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Sélection des lignes à surveiller."""
-        if user_input is not None:
-            self._selected_lines = user_input.get(CONF_LINES, [])
-            return await self.async_step_select_stations()
+        errors = {}
+        catalog = await async_get_line_catalog(self.hass, self._client())
 
-        # Créer les options de lignes groupées par type
-        metro_lines = {k: v["name"] for k, v in LINES.items() if v["type"] == "metro"}
-        rer_lines = {k: v["name"] for k, v in LINES.items() if v["type"] == "rer"}
-        tram_lines = {k: v["name"] for k, v in LINES.items() if v["type"] == "tram"}
+        if user_input is not None:
+            other_lines, unknown = catalog.resolve(user_input.get("other_lines", ""))
+            if unknown:
+                errors["other_lines"] = "unknown_line"
+            else:
+                self._selected_lines = list(
+                    dict.fromkeys([*user_input.get(CONF_LINES, []), *other_lines])
+                )
+                return await self.async_step_select_stations()
 
+        # Lignes ferrées et tramways dans la liste, les autres (bus...) par code
         return self.async_show_form(
             step_id="select_lines",
             data_schema=vol.Schema({
                 vol.Optional(CONF_LINES, default=[]): cv.multi_select(
-                    {**metro_lines, **rer_lines, **tram_lines}
+                    catalog.options(SELECTABLE_LINE_TYPES)
                 ),
+                vol.Optional("other_lines", default=""): str,
             }),
+            errors=errors,
             description_placeholders={
                 "info": "Sélectionnez les lignes pour lesquelles vous voulez les infos trafic"
             },
         )
 
+    def _client(self) -> IDFMApiClient:
+        """Client API du flow, sur la session HTTP partagée de Home Assistant."""
+        if self._api_client is None:
+            self._api_client = IDFMApiClient(
+                self._api_key,
+                session=async_get_clientsession(self.hass),
+                base_url=self._base_url,
+            )
+        return self._api_client
+
     async def async_step_select_stations(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
-        """Saisie manuelle des stations (ID ou recherche)."""
+        """Saisie des stations (recherche par nom ou IDs)."""
+        errors = {}
+        invalid_placeholder = ""
+
         if user_input is not None:
-            stations_input = user_input.get("stations_input", "")
-            
-            # Parser les IDs de stations (séparés par des virgules)
-            if stations_input:
-                self._selected_stations = [
-                    s.strip() for s in stations_input.split(",") if s.strip()
-                ]
-            
-            # Créer l'entrée de configuration
-            return self.async_create_entry(
-                title="IDFM Trafic",
-                data={
-                    CONF_API_KEY: self._api_key,
-                    CONF_LINES: self._selected_lines,
-                    CONF_STATIONS: self._selected_stations,
-                    "traffic_enabled": True,
-                    "departures_enabled": True,
-                },
+            self._selected_stations = _parse_station_ids(
+                user_input.get("stations_input", "")
             )
+            
+            # Recherche par nom dans l'index local des stations
+            query = user_input.get("station_search", "").strip()
+            if query:
+                index = await async_get_stop_area_index(self.hass, self._client())
+                if index is not None:
+                    self._search_results = dict(
+                        index.search(query, STOP_AREA_SEARCH_LIMIT)
+                    )
+                else:
+                    # Index indisponible : recherche en ligne
+                    places = await self._client().async_search_stations(query)
+                    self._search_results = {
+                        place["id"]: place.get("name", place["id"]) for place in places
+                    }
+                if self._search_results:
+                    return await self.async_step_search_results()
+                errors["station_search"] = "no_stations_found"
+            else:
+                # Vérifier toutes les stations en un lot avant de créer l'entrée
+                stations, invalid, unreachable = await async_resolve_stop_areas(
+                    self.hass, self._client(), self._selected_stations
+                )
+                if invalid:
+                    errors["stations_input"] = "invalid_stations"
+                    invalid_placeholder = ", ".join(invalid)
+                elif unreachable:
+                    errors["base"] = "cannot_connect"
+                else:
+                    return self.async_create_entry(
+                        title="IDFM Trafic",
+                        data={
+                            CONF_API_KEY: self._api_key,
+                            CONF_BASE_URL: self._base_url,
+                            CONF_LINES: self._selected_lines,
+                            CONF_STATIONS: self._selected_stations,
+                            CONF_STATION_INFO: _station_info_data(stations),
+                            "traffic_enabled": True,
+                            "departures_enabled": True,
+                        },
+                    )
 
         return self.async_show_form(
             step_id="select_stations",
             data_schema=vol.Schema({
-                vol.Optional("stations_input", default=""): str,
+                vol.Optional("station_search", default=""): str,
+                vol.Optional(
+                    "stations_input", default=",".join(self._selected_stations)
+                ): str,
             }),
+            errors=errors,
             description_placeholders={
-                "info": "Entrez les IDs de stations séparés par des virgules (ex: stop_area:IDFM:71234,stop_area:IDFM:71235). Laissez vide pour ne surveiller que les lignes."
+                "info": "Recherchez une station par nom, ou entrez les IDs de stations séparés par des virgules (ex: stop_area:IDFM:71234,stop_area:IDFM:71235). Laissez vide pour ne surveiller que les lignes.",
+                "invalid": invalid_placeholder,
             },
         )
 
+    async def async_step_search_results(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Choix parmi les stations trouvées par la recherche."""
+        if user_input is not None:
+            for station_id in user_input.get("stations_found", []):
+                if station_id not in self._selected_stations:
+                    self._selected_stations.append(station_id)
+            return await self.async_step_select_stations()
+
+        return self.async_show_form(
+            step_id="search_results",
+            data_schema=vol.Schema({
+                vol.Optional("stations_found", default=[]): cv.multi_select(
+                    self._search_results
+                ),
+            }),
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(
@@ -137,45 +286,208 @@ class IDFMTraficOptionsFlow(config_entries.OptionsFlow):
     def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
         """Initialisation de l'options flow."""
         self.config_entry = config_entry
+        # Données en cours de modification et stations restant à filtrer
+        self._data: dict[str, Any] = {}
+        self._pending_stations: list[str] = []
 
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Gestion des options."""
+        errors = {}
+        invalid_placeholder = ""
+        catalog = await async_get_line_catalog(self.hass, self._client())
+        selectable = catalog.options(SELECTABLE_LINE_TYPES)
+
         if user_input is not None:
-            # Parser les stations
-            stations_input = user_input.get("stations_input", "")
-            if stations_input:
-                stations = [s.strip() for s in stations_input.split(",") if s.strip()]
-            else:
-                stations = []
-            
-            # Mettre à jour entry.data
-            self.hass.config_entries.async_update_entry(
-                self.config_entry,
-                data={
+            other_lines, unknown = catalog.resolve(user_input.get("other_lines", ""))
+            # Vérifier toutes les stations en un lot (sauf celles déjà vérifiées)
+            stations, invalid, unreachable = await async_resolve_stop_areas(
+                self.hass,
+                self._client(),
+                _parse_station_ids(user_input.get("stations_input", "")),
+                # Les stations enregistrées sans IDs de lignes sont revérifiées
+                {
+                    station_id: StopAreaInfo(
+                        info["name"], tuple(info["lines"]), tuple(info["line_ids"])
+                    )
+                    for station_id, info in self.config_entry.data.get(
+                        CONF_STATION_INFO, {}
+                    ).items()
+                    if "line_ids" in info
+                },
+            )
+            if unknown:
+                errors["other_lines"] = "unknown_line"
+            if invalid:
+                errors["stations_input"] = "invalid_stations"
+                invalid_placeholder = ", ".join(invalid)
+            elif unreachable:
+                errors["base"] = "cannot_connect"
+            if not errors:
+                filters = self.config_entry.data.get(CONF_STATION_FILTERS, {})
+                self._data = {
                     **self.config_entry.data,
-                    CONF_LINES: user_input.get(CONF_LINES, []),
-                    CONF_STATIONS: stations,
+                    CONF_LINES: list(
+                        dict.fromkeys([*user_input.get(CONF_LINES, []), *other_lines])
+                    ),
+                    CONF_STATIONS: list(stations),
+                    CONF_STATION_INFO: _station_info_data(stations),
                     "traffic_enabled": user_input.get("traffic_enabled", True),
                     "departures_enabled": user_input.get("departures_enabled", True),
-                },
-            )
-            return self.async_create_entry(title="", data={})
+                    CONF_MAX_ATTRIBUTE_ITEMS: user_input.get(
+                        CONF_MAX_ATTRIBUTE_ITEMS, DEFAULT_MAX_ATTRIBUTE_ITEMS
+                    ),
+                    CONF_BASE_URL: user_input.get(
+                        CONF_BASE_URL,
+                        self.config_entry.data.get(CONF_BASE_URL, API_BASE_URL),
+                    ),
+                    # Filtres des stations retirées supprimés
+                    CONF_STATION_FILTERS: {
+                        station_id: station_filters
+                        for station_id, station_filters in filters.items()
+                        if station_id in stations
+                    },
+                }
+                if user_input.get("configure_stations") and stations:
+                    self._pending_stations = list(stations)
+                    return await self.async_step_station_filters()
+                return self._async_save()
 
         # Options actuelles
         current_lines = self.config_entry.data.get(CONF_LINES, [])
         current_stations = self.config_entry.data.get(CONF_STATIONS, [])
+        current_max_items = self.config_entry.data.get(
+            CONF_MAX_ATTRIBUTE_ITEMS, DEFAULT_MAX_ATTRIBUTE_ITEMS
+        )
+        # Les lignes hors liste (bus...) sont reprises par leur ID
+        current_other = [line_id for line_id in current_lines if line_id not in selectable]
 
-        # Créer les options de lignes
-        all_lines = {k: v["name"] for k, v in LINES.items()}
+        schema = {
+            vol.Optional(
+                CONF_LINES,
+                default=[line_id for line_id in current_lines if line_id in selectable],
+            ): cv.multi_select(selectable),
+            vol.Optional("other_lines", default=",".join(current_other)): str,
+            vol.Optional("stations_input", default=",".join(current_stations)): str,
+            vol.Optional("traffic_enabled", default=True): bool,
+            vol.Optional("departures_enabled", default=True): bool,
+            vol.Optional(CONF_MAX_ATTRIBUTE_ITEMS, default=current_max_items): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=50)
+            ),
+            # Étape suivante : filtres des départs station par station
+            vol.Optional("configure_stations", default=False): bool,
+        }
+        if self.show_advanced_options:
+            schema[
+                vol.Optional(
+                    CONF_BASE_URL,
+                    default=self.config_entry.data.get(CONF_BASE_URL, API_BASE_URL),
+                )
+            ] = cv.url
 
         return self.async_show_form(
             step_id="init",
+            data_schema=vol.Schema(schema),
+            errors=errors,
+            description_placeholders={"invalid": invalid_placeholder},
+        )
+
+    async def async_step_station_filters(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Filtres des départs d'une station, transmis à l'API."""
+        errors = {}
+        station_id = self._pending_stations[0]
+        station_info = self._data[CONF_STATION_INFO].get(station_id, {})
+        station_filters = self._data[CONF_STATION_FILTERS]
+
+        if user_input is not None:
+            stop_point = user_input.get(FILTER_STOP_POINT, "").strip()
+            if stop_point and not stop_point.startswith("stop_point:"):
+                errors[FILTER_STOP_POINT] = "invalid_stop_point"
+            else:
+                station_filters[station_id] = {
+                    FILTER_LINES: user_input.get(FILTER_LINES, []),
+                    FILTER_PHYSICAL_MODES: user_input.get(FILTER_PHYSICAL_MODES, []),
+                    FILTER_DIRECTIONS: [
+                        direction.strip()
+                        for direction in user_input.get(FILTER_DIRECTIONS, "").split(",")
+                        if direction.strip()
+                    ],
+                    FILTER_DURATION: user_input.get(FILTER_DURATION, 0),
+                    FILTER_COUNT: user_input.get(
+                        FILTER_COUNT, self._data[CONF_MAX_ATTRIBUTE_ITEMS]
+                    ),
+                    FILTER_REALTIME: user_input.get(FILTER_REALTIME, True),
+                    FILTER_STOP_POINT: stop_point or None,
+                    FILTER_SPLIT: user_input.get(FILTER_SPLIT, False),
+                }
+                self._pending_stations.pop(0)
+                if self._pending_stations:
+                    return await self.async_step_station_filters()
+                return self._async_save()
+
+        # Lignes desservies par la station, par ID (nommées d'après le catalogue)
+        catalog = await async_get_line_catalog(self.hass, self._client())
+        line_options = {}
+        for line_id in station_info.get("line_ids", []):
+            line_info = catalog.get(line_id)
+            line_options[line_id] = line_info.name if line_info else line_id
+        current = station_filters.get(station_id, {})
+
+        return self.async_show_form(
+            step_id="station_filters",
             data_schema=vol.Schema({
-                vol.Optional(CONF_LINES, default=current_lines): cv.multi_select(all_lines),
-                vol.Optional("stations_input", default=",".join(current_stations)): str,
-                vol.Optional("traffic_enabled", default=True): bool,
-                vol.Optional("departures_enabled", default=True): bool,
+                vol.Optional(
+                    FILTER_LINES,
+                    default=[
+                        line_id
+                        for line_id in current.get(FILTER_LINES, [])
+                        if line_id in line_options
+                    ],
+                ): cv.multi_select(line_options),
+                vol.Optional(
+                    FILTER_PHYSICAL_MODES, default=current.get(FILTER_PHYSICAL_MODES, [])
+                ): cv.multi_select(PHYSICAL_MODES),
+                vol.Optional(
+                    FILTER_DIRECTIONS,
+                    default=",".join(current.get(FILTER_DIRECTIONS, [])),
+                ): str,
+                vol.Optional(
+                    FILTER_DURATION, default=current.get(FILTER_DURATION, 0)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=24 * 60)),
+                vol.Optional(
+                    FILTER_COUNT,
+                    default=current.get(FILTER_COUNT, self._data[CONF_MAX_ATTRIBUTE_ITEMS]),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_DEPARTURES_COUNT)),
+                vol.Optional(
+                    FILTER_REALTIME, default=current.get(FILTER_REALTIME, True)
+                ): bool,
+                vol.Optional(
+                    FILTER_STOP_POINT, default=current.get(FILTER_STOP_POINT) or ""
+                ): str,
+                vol.Optional(FILTER_SPLIT, default=current.get(FILTER_SPLIT, False)): bool,
             }),
+            errors=errors,
+            description_placeholders={
+                "station": station_info.get("name", station_id),
+            },
+        )
+
+    @callback
+    def _async_save(self) -> FlowResult:
+        """Enregistrer les options dans entry.data."""
+        self.hass.config_entries.async_update_entry(self.config_entry, data=self._data)
+        return self.async_create_entry(title="", data={})
+
+    def _client(self) -> IDFMApiClient:
+        """Client API de l'entrée (celui du coordinateur si l'entrée est chargée)."""
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self.config_entry.entry_id)
+        if entry_data is not None:
+            return entry_data["client"]
+        return IDFMApiClient(
+            self.config_entry.data[CONF_API_KEY],
+            session=async_get_clientsession(self.hass),
+            base_url=self.config_entry.data.get(CONF_BASE_URL, API_BASE_URL),
         )
@@ -5,6 +5,8 @@ NAME = "IDFM Trafic"
 
 # API IDFM
 API_BASE_URL = "https://prim.iledefrance-mobilites.fr/marketplace/v2/navitia"
+# Ligne interrogée pour vérifier une API key (RER A)
+API_KEY_PROBE_LINE = "line:IDFM:C01742"
 
 # Types de transport
 TRANSPORT_TYPES = {
@@ -12,9 +14,14 @@ TRANSPORT_TYPES = {
     "rer": "RER",
     "train": "Train",
     "tram": "Tramway",
+    "bus": "Bus",
 }
 
-# Lignes principales (exemples - à compléter)
+# Types de lignes proposés dans la liste de sélection (les autres par code)
+SELECTABLE_LINE_TYPES = ("metro", "rer", "train", "tram")
+
+# Lignes principales : catalogue de repli tant que le catalogue complet
+# des lignes (lines.py) n'a pas pu être téléchargé
 LINES = {
     # Métros
     "line:IDFM:C01371": {"name": "Métro 1", "type": "metro", "color": "#FFCD00"},
@@ -44,9 +51,175 @@ LINES = {
     "line:IDFM:C01679": {"name": "Tramway T3b", "type": "tram", "color": "#00814F"},
 }
 
+# Perturbations d'équipements ignorées (ascenseurs, escalators, etc.)
+EQUIPMENT_TAGS = frozenset({"Ascenseur", "Escalator", "Escalier mécanique", "Escalier"})
+
+# Nombre de perturbations parsées gardées en cache
+DISRUPTION_CACHE_SIZE = 512
+
+# Couleurs selon la sévérité (vert si aucune)
+SEVERITY_COLORS = {
+    "blocking": "#FF0000",  # Rouge
+    "perturbation": "#FF8C00",  # Orange
+    "information": "#FFA500",  # Orange clair
+}
+NORMAL_COLOR = "#00FF00"  # Vert
+
 # Configuration
 CONF_API_KEY = "api_key"
 CONF_LINES = "lines"
 CONF_STATIONS = "stations"
 CONF_TRAFFIC_ENABLED = "traffic_enabled"
 CONF_DEPARTURES_ENABLED = "departures_enabled"
+CONF_MAX_ATTRIBUTE_ITEMS = "max_attribute_items"
+CONF_STATION_INFO = "station_info"
+CONF_BASE_URL = "base_url"
+CONF_STATION_FILTERS = "station_filters"
+
+# Filtres des départs d'une station (entry.data[CONF_STATION_FILTERS][station_id])
+FILTER_LINES = "lines"
+FILTER_PHYSICAL_MODES = "physical_modes"
+FILTER_DIRECTIONS = "directions"
+FILTER_DURATION = "duration"  # minutes, 0 = sans limite
+FILTER_COUNT = "count"
+FILTER_REALTIME = "realtime"
+FILTER_STOP_POINT = "stop_point"
+FILTER_SPLIT = "split"  # un sensor par ligne et direction
+
+# Nombre max de départs / messages exposés dans les attributs
+DEFAULT_MAX_ATTRIBUTE_ITEMS = 10
+
+# Mise à jour
+DEFAULT_SCAN_INTERVAL = 60  # secondes
+MIN_SCAN_INTERVAL = 15  # secondes
+POLL_JITTER = 0.1  # ±10 % sur chaque intervalle
+
+# Intervalles adaptatifs des départs selon le délai avant le prochain train
+# (délai max en secondes, intervalle en secondes), du plus court au plus long
+# (le compte à rebours est recalculé localement entre deux requêtes)
+DEPARTURES_POLL_INTERVALS = [
+    (300, 120),
+    (900, 180),
+    (1800, 240),
+]
+DEPARTURES_IDLE_INTERVAL = 300  # secondes, prochain départ lointain ou inconnu
+
+# Compte à rebours local des départs
+COUNTDOWN_TICK_INTERVAL = 15  # secondes
+DEPARTED_GRACE = 30  # secondes après l'heure de départ avant de retirer un train
+
+# Intervalles adaptatifs des infos trafic selon le statut de la ligne
+TRAFFIC_POLL_INTERVALS = {
+    "normal": 300,
+    "information": 180,
+    "perturbation": 60,
+}
+
+# Interruption de service nocturne (heure locale)
+NIGHT_PAUSE_START = (1, 45)
+NIGHT_PAUSE_END = (5, 0)
+# Fuseau des dates Navitia (heures locales sans décalage)
+NAVITIA_TIMEZONE = "Europe/Paris"
+DEFAULT_DEPARTURES_COUNT = 10
+MAX_DEPARTURES_COUNT = 50
+# Départs demandés en plus quand les directions sont filtrées localement
+DIRECTION_FILTER_OVERFETCH = 3
+# Stations séparées par ligne et direction : chaque groupe reçoit ses propres
+# départs (nombre de groupes supposé avant le premier résultat, et plafond de
+# départs par requête)
+SPLIT_MIN_GROUPS = 4
+SPLIT_MAX_DEPARTURES = 200
+
+# Modes physiques proposés pour filtrer les départs
+PHYSICAL_MODES = {
+    "physical_mode:Metro": "Métro",
+    "physical_mode:RapidTransit": "RER",
+    "physical_mode:LocalTrain": "Train",
+    "physical_mode:Tramway": "Tram",
+    "physical_mode:Bus": "Bus",
+}
+MAX_CONCURRENT_REQUESTS = 5
+INITIAL_REFRESH_DEADLINE = 20  # secondes pour le premier chargement
+
+# Décodage progressif des départs : seuls ces champs sont conservés
+STREAM_CHUNK_SIZE = 16384  # octets
+DEPARTURE_FIELDS = ("stop_date_time", "display_informations")
+
+# Infos trafic en masse : une requête pour tout le réseau au-delà de ce seuil
+BULK_LINE_REPORTS_THRESHOLD = 3
+BULK_LINE_REPORTS_COUNT = 1000
+DEFAULT_RESPONSE_REUSE_WINDOW = 5  # secondes
+
+# Cache des réponses : (motif du chemin, durée de validité, durée pendant
+# laquelle la réponse expirée est encore servie pendant sa revalidation).
+# Le premier motif trouvé s'applique ; sinon DEFAULT_RESPONSE_REUSE_WINDOW.
+# Les données temps réel interrogées par le coordinateur ne sont jamais
+# servies expirées (elles auraient un cycle de retard).
+RESPONSE_CACHE_POLICIES = (
+    ("/departures", 5, 0),
+    ("line_reports", 30, 0),
+    ("/places", 3600, 24 * 3600),
+    ("/stop_areas/", 3600, 24 * 3600),
+)
+# Durée de conservation des réponses expirées pour les requêtes conditionnelles
+RESPONSE_CACHE_RETENTION = 3600  # secondes
+# Dernières réponses valides gardées pour les pannes (hors cache) : seulement
+# pour les données temps réel interrogées par le coordinateur, pas pour les
+# référentiels téléchargés par pages
+LAST_GOOD_FAMILIES = frozenset({"departures", "line_reports"})
+LAST_GOOD_MAX_RESPONSES = 256
+
+# Disjoncteurs par famille de requêtes (premier segment du chemin trouvé)
+ENDPOINT_FAMILIES = (
+    "departures",
+    "line_reports",
+    "places",
+    "stop_areas",
+    "lines",
+)
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF = 30  # secondes
+BREAKER_MAX_BACKOFF = 900  # secondes
+BREAKER_BACKOFF_JITTER = 0.5  # part aléatoire retirée du délai
+
+# Mesures de performance du client
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # secondes
+METRICS_EWMA_WEIGHT = 0.2  # poids de la dernière requête dans la latence récente
+
+# Quotas PRIM (par clé API)
+DEFAULT_DAILY_QUOTA = 20000
+DEFAULT_REQUESTS_PER_SECOND = 5
+MAX_DEFERRAL_WAIT = 10  # secondes d'attente max sur un Retry-After
+DEFAULT_RETRY_AFTER = 60  # secondes, si l'API ne précise rien
+IMMINENT_DEPARTURE_THRESHOLD = 600  # secondes
+
+# Priorités des requêtes (la plus basse est servie en premier)
+PRIORITY_DEPARTURES_IMMINENT = 0
+PRIORITY_DEPARTURES = 1
+PRIORITY_TRAFFIC = 2
+PRIORITY_BACKGROUND = 3
+
+# Persistance des dernières données connues
+STORAGE_KEY = DOMAIN
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60  # secondes
+QUOTA_STORAGE_KEY = f"{DOMAIN}.quota"
+
+# Index local des stations
+STOP_AREA_PAGE_SIZE = 1000
+STOP_AREA_INDEX_TTL = 7 * 24 * 3600  # secondes
+STOP_AREA_SEARCH_LIMIT = 20
+
+# Catalogue des lignes (référentiel téléchargé et mis en cache sur disque)
+LINE_PAGE_SIZE = 1000
+LINE_CATALOG_TTL = 7 * 24 * 3600  # secondes
+
+# Clés de hass.data[DOMAIN]
+DATA_CLIENTS = "clients"
+DATA_RATE_LIMITERS = "rate_limiters"
+DATA_QUOTA_STORE = "quota_store"
+DATA_QUOTA_USAGE = "quota_usage"
+DATA_STOP_AREA_INDEX = "stop_area_index"
+DATA_LINE_CATALOG = "line_catalog"
+DATA_KNOWN_STOP_AREAS = "known_stop_areas"
+DATA_VALID_API_KEYS = "valid_api_keys"
@@ -0,0 +1,467 @@
+"""Coordinateur de mise à jour pour l'intégration IDFM Trafic."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+import random
+import time
+from typing import TYPE_CHECKING, Any
+from zoneinfo import ZoneInfo
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    BULK_LINE_REPORTS_THRESHOLD,
+    CONF_DEPARTURES_ENABLED,
+    CONF_LINES,
+    CONF_MAX_ATTRIBUTE_ITEMS,
+    CONF_STATION_FILTERS,
+    CONF_STATIONS,
+    CONF_TRAFFIC_ENABLED,
+    COUNTDOWN_TICK_INTERVAL,
+    DEFAULT_MAX_ATTRIBUTE_ITEMS,
+    DEFAULT_SCAN_INTERVAL,
+    DEPARTURES_IDLE_INTERVAL,
+    DEPARTURES_POLL_INTERVALS,
+    DOMAIN,
+    FILTER_SPLIT,
+    IMMINENT_DEPARTURE_THRESHOLD,
+    INITIAL_REFRESH_DEADLINE,
+    MIN_SCAN_INTERVAL,
+    NAVITIA_TIMEZONE,
+    NIGHT_PAUSE_END,
+    NIGHT_PAUSE_START,
+    POLL_JITTER,
+    SPLIT_MAX_DEPARTURES,
+    SPLIT_MIN_GROUPS,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    TRAFFIC_POLL_INTERVALS,
+)
+from .idfm_api import IDFMApiClient, IDFMTrafficParser
+from .models import Departure, DepartureQuery
+
+if TYPE_CHECKING:
+    from .entity import IDFMEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fuseau des horaires du service (pause nocturne)
+_SERVICE_TIMEZONE = ZoneInfo(NAVITIA_TIMEZONE)
+
+
+def _cache_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Stockage des dernières données connues d'une entrée."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry_id}")
+
+
+async def async_remove_cache(hass: HomeAssistant, entry_id: str) -> None:
+    """Supprimer les données persistées d'une entrée."""
+    await _cache_store(hass, entry_id).async_remove()
+
+
+class IDFMDataUpdateCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """
+    Coordinateur qui rafraîchit les lignes et stations d'une entrée en un lot.
+
+    Chaque ressource (ligne ou station) a sa propre échéance de mise à jour,
+    recalculée après chaque requête selon les données reçues. À chaque réveil,
+    seules les ressources échues sont interrogées, puis le coordinateur se
+    replanifie sur la prochaine échéance.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: IDFMApiClient,
+        entry: ConfigEntry,
+    ) -> None:
+        """Initialisation du coordinateur."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=timedelta(seconds=DEFAULT_SCAN_INTERVAL),
+        )
+        self.client = client
+        self._entry = entry
+        # Échéance (time.monotonic) de chaque ressource, par (type, id)
+        self._next_refresh: dict[tuple[str, str], float] = {}
+        # Ressources dont la dernière requête a échoué, par (type, id)
+        self._failing: set[tuple[str, str]] = set()
+        # Entités dont l'état doit être écrit au prochain tour de boucle
+        self._pending_writes: dict[IDFMEntity, None] = {}
+        self._write_handle: asyncio.Handle | None = None
+        # Dernières données connues, persistées pour un démarrage instantané
+        self._store = _cache_store(hass, entry.entry_id)
+        # True tant que les données viennent du stockage et pas de l'API
+        self.stale = False
+        # Durée (secondes) du premier chargement depuis l'API
+        self.initial_refresh_duration: float | None = None
+        # Départs groupés par ligne et direction, par station, avec la liste
+        # de départs dont ils sont issus
+        self._departure_groups: dict[
+            str, tuple[list[Departure], dict[tuple[str, str], list[Departure]]]
+        ] = {}
+
+    @property
+    def lines(self) -> list[str]:
+        """Lignes surveillées pour les infos trafic."""
+        if not self._entry.data.get(CONF_TRAFFIC_ENABLED, True):
+            return []
+        return list(self._entry.data.get(CONF_LINES, []))
+
+    @property
+    def stations(self) -> list[str]:
+        """Stations surveillées pour les prochains départs."""
+        if not self._entry.data.get(CONF_DEPARTURES_ENABLED, True):
+            return []
+        return list(self._entry.data.get(CONF_STATIONS, []))
+
+    @property
+    def traffic_stations(self) -> list[str]:
+        """Stations surveillées pour les infos trafic."""
+        if not self._entry.data.get(CONF_TRAFFIC_ENABLED, True):
+            return []
+        return list(self._entry.data.get(CONF_STATIONS, []))
+
+    @property
+    def station_queries(self) -> dict[str, DepartureQuery]:
+        """
+        Requête des départs de chaque station.
+
+        Sans filtre, une station demande autant de départs que le sensor en
+        affiche. Une station séparée par ligne et direction en demande autant
+        pour chacun de ses groupes (ceux déjà vus, au moins SPLIT_MIN_GROUPS),
+        dans la limite de SPLIT_MAX_DEPARTURES : sinon les groupes seraient
+        découpés dans les seuls premiers départs de la station.
+        """
+        filters = self._entry.data.get(CONF_STATION_FILTERS, {})
+        queries = {}
+        for station_id in self.stations:
+            options = filters.get(station_id)
+            query = DepartureQuery.from_options(options, self.max_attribute_items)
+            if options and options.get(FILTER_SPLIT):
+                groups = max(SPLIT_MIN_GROUPS, len(self.departure_groups(station_id)))
+                query = query._replace(
+                    groups=max(1, min(groups, SPLIT_MAX_DEPARTURES // query.count))
+                )
+            queries[station_id] = query
+        return queries
+
+    async def async_initial_refresh(self) -> None:
+        """
+        Premier chargement, lancé en arrière-plan après l'enregistrement des entités.
+
+        Toutes les ressources sont interrogées en un seul lot borné par
+        INITIAL_REFRESH_DEADLINE ; celles qui n'ont pas répondu à temps seront
+        reprises au cycle suivant.
+        """
+        start = time.monotonic()
+        await self.async_refresh()
+        self.initial_refresh_duration = time.monotonic() - start
+        _LOGGER.debug(
+            "Premier chargement IDFM terminé en %.2f s", self.initial_refresh_duration
+        )
+        self.async_update_listeners()
+
+    async def async_load_cache(self) -> bool:
+        """
+        Charger les dernières données connues depuis le stockage.
+
+        Les données chargées sont marquées comme périmées (`stale`) jusqu'au
+        premier rafraîchissement réussi.
+
+        Returns:
+            True si des données ont été chargées
+        """
+        cached = await self._store.async_load()
+        if not cached:
+            return False
+
+        lines = set(self.lines)
+        stations = set(self.stations)
+        traffic_stations = set(self.traffic_stations)
+        try:
+            self.data = {
+                "lines": {
+                    line_id: traffic
+                    for line_id, traffic in cached.get("lines", {}).items()
+                    if line_id in lines
+                },
+                "stations": {
+                    stop_area_id: IDFMTrafficParser.refresh_departures(
+                        [Departure(**departure) for departure in departures]
+                    )
+                    for stop_area_id, departures in cached.get("stations", {}).items()
+                    if stop_area_id in stations
+                },
+                "station_traffic": {
+                    stop_area_id: traffic
+                    for stop_area_id, traffic in cached.get("station_traffic", {}).items()
+                    if stop_area_id in traffic_stations
+                },
+            }
+        except (TypeError, AttributeError) as err:
+            _LOGGER.debug("Cache IDFM ignoré (format obsolète): %s", err)
+            return False
+
+        self.stale = True
+        return True
+
+    @callback
+    def _cache_payload(self) -> dict[str, Any]:
+        """Données à persister (appelé au moment de l'écriture)."""
+        data = self.data or {"lines": {}, "stations": {}, "station_traffic": {}}
+        return {
+            "lines": data["lines"],
+            "station_traffic": data.get("station_traffic", {}),
+            "stations": {
+                stop_area_id: [departure._asdict() for departure in departures]
+                for stop_area_id, departures in data["stations"].items()
+            },
+        }
+
+    @property
+    def max_attribute_items(self) -> int:
+        """Nombre max de départs / messages exposés dans les attributs."""
+        return self._entry.data.get(CONF_MAX_ATTRIBUTE_ITEMS, DEFAULT_MAX_ATTRIBUTE_ITEMS)
+
+    def departure_groups(self, station_id: str) -> dict[tuple[str, str], list[Departure]]:
+        """
+        Prochains départs d'une station par (code de ligne, direction).
+
+        Calculés une seule fois par version des départs de la station, pour
+        tous les sensors de la station.
+        """
+        departures = self.data["stations"].get(station_id, []) if self.data else []
+        cached = self._departure_groups.get(station_id)
+        if cached is None or cached[0] is not departures:
+            cached = (
+                departures,
+                IDFMTrafficParser.group_departures(departures, self.max_attribute_items),
+            )
+            self._departure_groups[station_id] = cached
+        return cached[1]
+
+    @callback
+    def async_schedule_write(self, entity: IDFMEntity) -> None:
+        """Regrouper l'écriture d'état des entités en un seul tour de boucle."""
+        self._pending_writes[entity] = None
+        if self._write_handle is None:
+            self._write_handle = self.hass.loop.call_soon(self._async_flush_writes)
+
+    @callback
+    def _async_flush_writes(self) -> None:
+        """Écrire l'état de toutes les entités modifiées."""
+        self._write_handle = None
+        entities = list(self._pending_writes)
+        self._pending_writes.clear()
+        for entity in entities:
+            if entity.hass is not None:
+                entity.async_write_ha_state()
+
+    @callback
+    def async_start_countdown(self) -> CALLBACK_TYPE:
+        """Démarrer le compte à rebours local des départs (retourne la désinscription)."""
+        return async_track_time_interval(
+            self.hass, self._async_countdown_tick, timedelta(seconds=COUNTDOWN_TICK_INTERVAL)
+        )
+
+    @callback
+    def _async_countdown_tick(self, _now: datetime) -> None:
+        """Recalculer les temps restants entre deux requêtes et notifier si besoin."""
+        if not self.data or not self.data["stations"]:
+            return
+
+        changed = False
+        stations: dict[str, list[Departure]] = {}
+        for stop_area_id, departures in self.data["stations"].items():
+            refreshed = IDFMTrafficParser.refresh_departures(departures)
+            if len(refreshed) != len(departures) or any(
+                new is not old for new, old in zip(refreshed, departures)
+            ):
+                changed = True
+            stations[stop_area_id] = refreshed
+
+        if changed:
+            # Pas de async_set_updated_data : il replanifierait les requêtes
+            self.data = {**self.data, "stations": stations}
+            self.async_update_listeners()
+
+    def _imminent_stations(self) -> set[str]:
+        """Stations dont le prochain départ connu est imminent."""
+        if not self.data:
+            return set()
+        horizon = time.time() + IMMINENT_DEPARTURE_THRESHOLD
+        return {
+            stop_area_id
+            for stop_area_id, departures in self.data["stations"].items()
+            if departures and departures[0].departure_timestamp <= horizon
+        }
+
+    @staticmethod
+    def _departures_interval(departures: list[Departure]) -> float:
+        """Intervalle de mise à jour d'une station selon son prochain départ."""
+        if not departures:
+            return DEPARTURES_IDLE_INTERVAL
+        wait = departures[0].departure_timestamp - time.time()
+        for max_wait, interval in DEPARTURES_POLL_INTERVALS:
+            if wait <= max_wait:
+                return interval
+        return DEPARTURES_IDLE_INTERVAL
+
+    @staticmethod
+    def _traffic_interval(traffic: dict[str, Any]) -> float:
+        """Intervalle de mise à jour d'une ligne selon son statut."""
+        return TRAFFIC_POLL_INTERVALS.get(traffic.get("status"), DEFAULT_SCAN_INTERVAL)
+
+    @staticmethod
+    def _seconds_until_service(now: datetime) -> float:
+        """Secondes restantes avant la reprise du service (0 hors pause nocturne)."""
+        start = now.replace(
+            hour=NIGHT_PAUSE_START[0], minute=NIGHT_PAUSE_START[1], second=0, microsecond=0
+        )
+        end = now.replace(
+            hour=NIGHT_PAUSE_END[0], minute=NIGHT_PAUSE_END[1], second=0, microsecond=0
+        )
+        if start <= now < end:
+            # Écart en temps réel : la différence de deux dates du même fuseau
+            # ignore le changement d'heure
+            return end.timestamp() - now.timestamp()
+        return 0.0
+
+    def _schedule(self, kind: str, key: str, interval: float, now: float) -> None:
+        """Fixer l'échéance d'une ressource, avec une gigue aléatoire."""
+        jitter = random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        self._next_refresh[(kind, key)] = now + max(MIN_SCAN_INTERVAL, interval * jitter)
+
+    def _due(self, kind: str, keys: list[str], now: float) -> list[str]:
+        """Ressources dont l'échéance est atteinte (ou jamais interrogées)."""
+        return [key for key in keys if self._next_refresh.get((kind, key), 0.0) <= now]
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        """Récupérer les ressources échues de l'entrée en une seule passe."""
+        lines = self.lines
+        stations = self.stations
+        traffic_stations = self.traffic_stations
+        previous = self.data or {"lines": {}, "stations": {}, "station_traffic": {}}
+        now = time.monotonic()
+
+        # Pas de requêtes pendant la pause nocturne (sauf au démarrage), à
+        # l'heure de Paris quel que soit le fuseau de l'instance
+        pause = self._seconds_until_service(dt_util.now(_SERVICE_TIMEZONE))
+        if pause and self.data is not None:
+            jitter = random.uniform(0, DEFAULT_SCAN_INTERVAL)
+            self.update_interval = timedelta(seconds=pause + jitter)
+            self._next_refresh.clear()
+            return previous
+
+        due_lines = self._due("lines", lines, now)
+        due_stations = self._due("stations", stations, now)
+        due_traffic_stations = self._due("station_traffic", traffic_stations, now)
+
+        # Une seule requête couvre tout le réseau : autant rafraîchir toutes les
+        # lignes et toutes les stations
+        if (due_lines or due_traffic_stations) and (
+            traffic_stations or len(lines) >= BULK_LINE_REPORTS_THRESHOLD
+        ):
+            due_lines = lines
+            due_traffic_stations = traffic_stations
+
+        data = {"lines": {}, "stations": {}, "station_traffic": {}}
+        if due_lines or due_stations or due_traffic_stations:
+            data = await self.client.async_get_all_data(
+                due_lines,
+                due_stations,
+                imminent_stations=self._imminent_stations(),
+                deadline=(
+                    INITIAL_REFRESH_DEADLINE if self.initial_refresh_duration is None else None
+                ),
+                station_queries=self.station_queries,
+                traffic_stations=due_traffic_stations,
+            )
+
+        now = time.monotonic()
+        for line_id in due_lines:
+            traffic = data["lines"].get(line_id)
+            interval = (
+                self._traffic_interval(traffic) if traffic else DEFAULT_SCAN_INTERVAL
+            )
+            self._schedule("lines", line_id, interval, now)
+        for stop_area_id in due_traffic_stations:
+            traffic = data["station_traffic"].get(stop_area_id)
+            interval = (
+                self._traffic_interval(traffic) if traffic else DEFAULT_SCAN_INTERVAL
+            )
+            self._schedule("station_traffic", stop_area_id, interval, now)
+        for stop_area_id in due_stations:
+            departures = data["stations"].get(stop_area_id)
+            interval = (
+                self._departures_interval(departures)
+                if departures is not None
+                else DEFAULT_SCAN_INTERVAL
+            )
+            self._schedule("stations", stop_area_id, interval, now)
+
+        # Se réveiller à la prochaine échéance
+        if self._next_refresh:
+            next_due = min(self._next_refresh.values()) - now
+            self.update_interval = timedelta(seconds=max(MIN_SCAN_INTERVAL, next_due))
+
+        for kind, due in (
+            ("lines", due_lines),
+            ("stations", due_stations),
+            ("station_traffic", due_traffic_stations),
+        ):
+            for key in due:
+                if key in data[kind]:
+                    self._failing.discard((kind, key))
+                else:
+                    self._failing.add((kind, key))
+
+        received = data["lines"] or data["stations"] or data["station_traffic"]
+        if (due_lines or due_stations or due_traffic_stations) and not received:
+            if self.stale:
+                # API injoignable au démarrage : les données enregistrées restent
+                # servies (toujours marquées périmées) plutôt qu'indisponibles
+                _LOGGER.debug(
+                    "Aucune donnée reçue de l'API IDFM, données enregistrées conservées"
+                )
+                return previous
+            # Une ressource en échec garde sa dernière valeur et sera reprise à
+            # sa prochaine échéance ; l'entrée n'échoue que si plus rien ne répond
+            all_failing = all(
+                (kind, key) in self._failing
+                for kind, keys in (
+                    ("lines", lines),
+                    ("stations", stations),
+                    ("station_traffic", traffic_stations),
+                )
+                for key in keys
+            )
+            if self.data is None or all_failing:
+                raise UpdateFailed("Aucune donnée reçue de l'API IDFM")
+            _LOGGER.debug("Pas de données pour ce cycle, dernières valeurs conservées")
+            return previous
+
+        if received:
+            self.stale = False
+            self._store.async_delay_save(self._cache_payload, STORAGE_SAVE_DELAY)
+
+        # Conserver la dernière valeur connue des ressources non rafraîchies
+        return {
+            "lines": {**previous["lines"], **data["lines"]},
+            "stations": {**previous["stations"], **data["stations"]},
+            "station_traffic": {
+                **previous.get("station_traffic", {}),
+                **data["station_traffic"],
+            },
+        }
@@ -0,0 +1,138 @@
+"""Décodage typé des réponses Navitia (départs et perturbations)."""
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from .const import NAVITIA_TIMEZONE
+from .models import Departure, Disruption
+
+_TIMEZONE = ZoneInfo(NAVITIA_TIMEZONE)
+
+
+def _text(mapping: dict[str, Any], key: str) -> str:
+    """Valeur texte d'un champ ("" si absente ou d'un autre type)."""
+    value = mapping.get(key)
+    return value if isinstance(value, str) else ""
+
+
+@lru_cache(maxsize=256)
+def _hour_start(prefix: str) -> tuple[float, str]:
+    """
+    Début d'une heure locale ("YYYYMMDDTHH") : horodatage et décalage UTC.
+
+    Le décalage ne change qu'à une heure pile : il est calculé une fois par
+    heure puis réutilisé. Pendant l'heure répétée du passage à l'heure
+    d'hiver, la première occurrence (heure d'été) est retenue.
+    """
+    start = datetime(
+        int(prefix[0:4]),
+        int(prefix[4:6]),
+        int(prefix[6:8]),
+        int(prefix[9:11]),
+        tzinfo=_TIMEZONE,
+    )
+    return start.timestamp(), start.isoformat()[19:]
+
+
+def decode_timestamp(value: str) -> tuple[float, str]:
+    """
+    Décoder une date Navitia ("20240101T080300", heure de Paris).
+
+    Returns:
+        (horodatage, date ISO 8601 avec décalage UTC)
+
+    Raises:
+        ValueError: si la date est invalide
+    """
+    if len(value) != 15 or value[8] != "T" or not value[11:15].isdigit():
+        raise ValueError(f"Date Navitia invalide: {value!r}")
+    minutes = int(value[11:13])
+    seconds = int(value[13:15])
+    if minutes > 59 or seconds > 59:
+        raise ValueError(f"Date Navitia invalide: {value!r}")
+    hour_start, offset = _hour_start(value[:11])
+    return (
+        hour_start + minutes * 60 + seconds,
+        f"{value[0:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}{offset}",
+    )
+
+
+def format_time_remaining(seconds: float) -> str:
+    """Formater le temps restant avant un départ ("À l'approche", "3 min")."""
+    if seconds < 60:
+        return "À l'approche"
+    return f"{int(seconds / 60)} min"
+
+
+def decode_departure(raw: Any, now: float) -> Departure | None:
+    """
+    Décoder un départ de la réponse departures.
+
+    Returns:
+        Le départ, ou None si l'objet ne respecte pas le schéma attendu
+    """
+    if not isinstance(raw, dict):
+        return None
+    stop_date_time = raw.get("stop_date_time")
+    display = raw.get("display_informations")
+    if not isinstance(stop_date_time, dict) or not isinstance(display, dict):
+        return None
+    value = stop_date_time.get("departure_date_time")
+    if not isinstance(value, str):
+        return None
+    try:
+        timestamp, iso = decode_timestamp(value)
+    except ValueError:
+        return None
+
+    return Departure(
+        line=_text(display, "label"),
+        line_code=_text(display, "code"),
+        direction=_text(display, "direction"),
+        departure_time=iso,
+        departure_timestamp=timestamp,
+        time_remaining=format_time_remaining(timestamp - now),
+        platform=_text(stop_date_time, "departure_platform"),
+        headsign=_text(display, "headsign"),
+        network=_text(display, "network"),
+    )
+
+
+def decode_disruption(raw: Any) -> Disruption | None:
+    """
+    Décoder une perturbation (disruptions[] des line_reports).
+
+    Returns:
+        La perturbation, ou None si l'objet ne respecte pas le schéma attendu
+    """
+    if not isinstance(raw, dict):
+        return None
+    severity = raw.get("severity")
+    tags = raw.get("tags")
+    messages = []
+    raw_messages = raw.get("messages")
+    if isinstance(raw_messages, list):
+        for message in raw_messages:
+            if not isinstance(message, dict):
+                continue
+            channel = message.get("channel")
+            messages.append((
+                _text(channel, "name") if isinstance(channel, dict) else "",
+                _text(message, "text"),
+            ))
+
+    return Disruption(
+        id=_text(raw, "id"),
+        status=_text(raw, "status"),
+        updated_at=_text(raw, "updated_at"),
+        effect=_text(severity, "effect") if isinstance(severity, dict) else "",
+        tags=tuple(tag for tag in tags if isinstance(tag, str))
+        if isinstance(tags, list)
+        else (),
+        category=_text(raw, "category"),
+        cause=_text(raw, "cause"),
+        messages=tuple(messages),
+    )
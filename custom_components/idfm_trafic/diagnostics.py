@@ -0,0 +1,40 @@
+"""Diagnostics pour l'intégration IDFM Trafic."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_API_KEY, DOMAIN
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Diagnostics d'une entrée : configuration, coordinateur et mesures du client."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    data = coordinator.data or {}
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "initial_refresh_duration": coordinator.initial_refresh_duration,
+            "lines": len(coordinator.lines),
+            "stations": len(coordinator.stations),
+            "lines_with_data": len(data.get("lines", {})),
+            "stations_with_data": len(data.get("stations", {})),
+        },
+        "client": coordinator.client.diagnostics(),
+    }
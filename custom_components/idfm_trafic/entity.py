@@ -0,0 +1,72 @@
+"""Entité de base pour l'intégration IDFM Trafic."""
+from __future__ import annotations
+
+from collections.abc import Hashable
+from typing import Any
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import IDFMDataUpdateCoordinator
+
+
+class IDFMEntity(CoordinatorEntity[IDFMDataUpdateCoordinator]):
+    """
+    Entité IDFM qui n'écrit son état que lorsque ses données ont changé.
+
+    Chaque entité fournit une empreinte peu coûteuse de ce qu'elle affiche
+    (`_fingerprint`, l'état par défaut). À chaque mise à jour du coordinateur, l'état n'est
+    réécrit que si cette empreinte a changé, et les écritures de toutes les
+    entités de l'entrée sont regroupées par le coordinateur.
+
+    Les attributs sont construits par `_build_attributes` une seule fois par
+    version des données du coordinateur, puis réutilisés.
+    """
+
+    _last_fingerprint: Hashable | None = None
+    _attributes: dict[str, Any] | None = None
+    _attributes_source: Any = None
+
+    def _fingerprint(self) -> Hashable:
+        """
+        Empreinte des données affichées par l'entité.
+
+        Par défaut l'état lui-même : une entité dont les attributs changent
+        sans que l'état change doit fournir sa propre empreinte.
+        """
+        return self.state
+
+    def _full_fingerprint(self) -> Hashable:
+        """Empreinte complète : disponibilité, fraîcheur et données affichées."""
+        return self.available, self.coordinator.stale, self._fingerprint()
+
+    def _build_attributes(self) -> dict[str, Any]:
+        """Construire les attributs supplémentaires."""
+        return {}
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Attributs supplémentaires (mis en cache par version des données)."""
+        data = self.coordinator.data
+        if self._attributes is None or data is not self._attributes_source:
+            self._attributes = self._build_attributes()
+            self._attributes_source = data
+            if self._attributes and self.coordinator.stale:
+                # Données chargées depuis le stockage, en attente de l'API
+                self._attributes["stale"] = True
+        return self._attributes
+
+    async def async_added_to_hass(self) -> None:
+        """Quand l'entité est ajoutée à Home Assistant."""
+        await super().async_added_to_hass()
+        # L'état initial est écrit par la plateforme lors de l'ajout
+        self._last_fingerprint = self._full_fingerprint()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Programmer l'écriture de l'état seulement s'il a changé."""
+        fingerprint = self._full_fingerprint()
+        if fingerprint == self._last_fingerprint:
+            return
+        self._last_fingerprint = fingerprint
+        self.coordinator.async_schedule_write(self)
@@ -146,11 +146,8 @@ cards:
       **Prochain:** {{ next.line }} → {{ next.direction }} - {{ next.time }}
       {% endif %}
       
-      {% for i in range(2, 4) %}
-      {% set dep = state_attr('sensor.chatelet_departs', 'departure_' ~ i) %}
-      {% if dep %}
-      {{ dep.line }} → {{ dep.direction }} - {{ dep.time }}
-      {% endif %}
+      {% for dep in (state_attr('sensor.chatelet_departs', 'departures') or [])[1:3] %}
+      {{ dep.line }} → {{ dep.direction }} - {{ dep.time_remaining }}
       {% endfor %}
   
   # Alertes
@@ -2,99 +2,703 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+from collections import OrderedDict
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+import html
+import json
 import logging
 import re
-from datetime import datetime
-from typing import Any
+import time
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
 
 import aiohttp
 
-from .const import API_BASE_URL
+try:
+    from aiohttp.compression_utils import HAS_BROTLI
+except ImportError:  # aiohttp < 3.9
+    HAS_BROTLI = False
+
+from .const import (
+    API_BASE_URL,
+    API_KEY_PROBE_LINE,
+    BULK_LINE_REPORTS_COUNT,
+    BULK_LINE_REPORTS_THRESHOLD,
+    DEFAULT_DAILY_QUOTA,
+    DEFAULT_DEPARTURES_COUNT,
+    DEFAULT_REQUESTS_PER_SECOND,
+    DEFAULT_RESPONSE_REUSE_WINDOW,
+    DEFAULT_RETRY_AFTER,
+    DEPARTED_GRACE,
+    DEPARTURE_FIELDS,
+    DISRUPTION_CACHE_SIZE,
+    ENDPOINT_FAMILIES,
+    EQUIPMENT_TAGS,
+    LAST_GOOD_FAMILIES,
+    LAST_GOOD_MAX_RESPONSES,
+    LINE_PAGE_SIZE,
+    MAX_CONCURRENT_REQUESTS,
+    PRIORITY_BACKGROUND,
+    PRIORITY_DEPARTURES,
+    PRIORITY_DEPARTURES_IMMINENT,
+    PRIORITY_TRAFFIC,
+    RESPONSE_CACHE_POLICIES,
+    RESPONSE_CACHE_RETENTION,
+    STOP_AREA_PAGE_SIZE,
+    STREAM_CHUNK_SIZE,
+)
+from .circuit_breaker import (
+    ERROR_AUTH,
+    ERROR_CLIENT,
+    ERROR_NETWORK,
+    ERROR_QUOTA,
+    ERROR_SERVER,
+    ERROR_TIMEOUT,
+    OUTAGE_ERRORS,
+    STATE_CLOSED,
+    CircuitBreaker,
+    error_for_status,
+)
+from .decoders import decode_departure, decode_disruption, format_time_remaining
+from .metrics import ClientMetrics, EndpointMetrics
+from .models import Departure, DepartureQuery, Disruption
+from .rate_limiter import PRIMRateLimiter
+from .streaming import JSONArrayStream
 
 _LOGGER = logging.getLogger(__name__)
 
+_HTML_TAG = re.compile(r"<[^<]+?>")
+
+
+def html_to_text(text: str) -> str:
+    """Convertir un message HTML de l'API en texte brut."""
+    text = html.unescape(_HTML_TAG.sub("", text))
+    return text.replace("\xa0", " ").strip()
+
+
+def _parse_retry_after(value: str | None) -> float:
+    """Convertir un en-tête Retry-After (secondes ou date HTTP) en secondes."""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _parse_cache_control(value: str | None) -> tuple[float | None, bool]:
+    """
+    Lire un en-tête Cache-Control.
+
+    Returns:
+        (max-age en secondes ou None, True si la réponse ne doit pas être gardée)
+    """
+    if not value:
+        return None, False
+    max_age = None
+    no_store = False
+    for directive in value.lower().split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name == "no-store":
+            no_store = True
+        elif name == "no-cache":
+            max_age = 0.0
+        elif name == "max-age" and max_age is None:
+            try:
+                max_age = max(0.0, float(argument.strip('"')))
+            except ValueError:
+                pass
+    return max_age, no_store
+
+
+def _endpoint_family(url: str) -> str:
+    """Famille de requêtes d'une URL (voir ENDPOINT_FAMILIES)."""
+    segments = urlsplit(url).path.split("/")
+    return next((family for family in ENDPOINT_FAMILIES if family in segments), "other")
+
+
+def _is_last_page(result: dict[str, Any], key: str) -> bool:
+    """
+    Dernière page d'une réponse paginée, d'après son bloc `pagination`.
+
+    La taille de page renvoyée (`items_per_page`) est utilisée plutôt que
+    celle demandée, que le serveur peut plafonner ; sans total connu, seule
+    une page vide termine le parcours.
+    """
+    items = result.get(key)
+    if not items:
+        return True
+    pagination = result.get("pagination") or {}
+    total = pagination.get("total_result")
+    if total is None:
+        return False
+    per_page = pagination.get("items_per_page") or len(items)
+    return (pagination.get("start_page", 0) + 1) * per_page >= total
+
+
+def _departures_endpoint(stop_area_id: str, query: DepartureQuery) -> str:
+    """
+    Chemin de la requête des départs, avec les filtres traduits en paramètres.
+
+    Une seule ligne (ou un seul mode) est ajoutée au chemin ; plusieurs
+    passent par le paramètre `filter`. Les lignes priment sur les modes,
+    puisqu'une ligne n'a qu'un mode.
+    """
+    if query.stop_point:
+        path = f"stop_points/{quote(query.stop_point, safe=':')}"
+    else:
+        path = f"stop_areas/{quote(stop_area_id, safe=':')}"
+
+    params: dict[str, Any] = {
+        "count": query.request_count,
+        "data_freshness": "realtime" if query.realtime else "base_schedule",
+        "disable_geojson": "true",
+    }
+    if query.duration:
+        params["duration"] = query.duration
+
+    collection, uris = (
+        ("lines", query.lines) if query.lines else ("physical_modes", query.physical_modes)
+    )
+    if len(uris) == 1:
+        path = f"{path}/{collection}/{quote(uris[0], safe=':')}"
+    elif uris:
+        params["filter"] = " or ".join(f"{collection[:-1]}.uri={uri}" for uri in uris)
+
+    return f"{path}/departures?{urlencode(params)}"
+
+
+class _CachedResponse(NamedTuple):
+    """Réponse gardée en cache avec ses validateurs HTTP."""
+
+    data: dict[str, Any]
+    fetched_at: float
+    ttl: float
+    stale_ttl: float
+    etag: str | None
+    last_modified: str | None
+    size: int
+
 
 class IDFMApiClient:
     """Client pour l'API IDFM."""
 
-    def __init__(self, api_key: str) -> None:
-        """Initialisation du client API."""
+    def __init__(
+        self,
+        api_key: str,
+        session: aiohttp.ClientSession | None = None,
+        reuse_window: float = DEFAULT_RESPONSE_REUSE_WINDOW,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        daily_quota: int = DEFAULT_DAILY_QUOTA,
+        base_url: str = API_BASE_URL,
+        rate_limiter: PRIMRateLimiter | None = None,
+    ) -> None:
+        """
+        Initialisation du client API.
+
+        Args:
+            api_key: Clé API PRIM
+            session: Session aiohttp partagée (ex: celle gérée par Home
+                Assistant). Elle n'est jamais fermée par le client.
+            reuse_window: Durée (secondes) pendant laquelle une réponse qui
+                vient d'être reçue est réutilisée pour la même URL, pour les
+                requêtes sans règle dans RESPONSE_CACHE_POLICIES
+            requests_per_second: Débit maximal autorisé par PRIM
+            daily_quota: Nombre de requêtes autorisées par jour par PRIM
+            base_url: URL de l'API Navitia (ex: un serveur de substitution
+                local pour les tests de charge)
+            rate_limiter: Limiteur partagé, qui survit au client (sinon un
+                limiteur propre au client est créé)
+        """
         self.api_key = api_key
-        self.session: aiohttp.ClientSession | None = None
+        self.base_url = base_url.rstrip("/")
+        self.session: aiohttp.ClientSession | None = session
+        self._owns_session = session is None
         self._headers = {
             "apiKey": api_key,
             "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate",
         }
+        self._reuse_window = reuse_window
+        # Requêtes en cours et réponses en cache, par URL normalisée
+        self._inflight: dict[str, asyncio.Task[dict[str, Any] | None]] = {}
+        self._cache: dict[str, _CachedResponse] = {}
+        # Dernière réponse valide par URL normalisée (LAST_GOOD_FAMILIES),
+        # servie pendant les pannes même quand le cache ne la garde pas
+        self._last_good: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # Type de la dernière erreur par URL normalisée (effacé au succès)
+        self._errors: dict[str, str] = {}
+        self.rate_limiter = rate_limiter or PRIMRateLimiter(
+            requests_per_second, daily_quota
+        )
+        # Disjoncteurs par famille de requêtes (voir ENDPOINT_FAMILIES)
+        self.breakers: dict[str, CircuitBreaker] = {}
+        # Mesures par famille de requêtes et temps de parsing
+        self.metrics = ClientMetrics()
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Obtenir ou créer une session aiohttp."""
         if self.session is None or self.session.closed:
             self.session = aiohttp.ClientSession()
+            self._owns_session = True
         return self.session
 
-    async def _request(self, endpoint: str) -> dict[str, Any] | None:
-        """Effectuer une requête à l'API."""
-        url = f"{API_BASE_URL}/{endpoint}"
-        
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        """Normaliser une URL (paramètres triés, sans « ? » final) pour la dédoublonner."""
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+    def _cache_policy(self, url: str) -> tuple[float, float]:
+        """Durée de validité et durée de service en revalidation d'une URL."""
+        path = urlsplit(url).path
+        for pattern, ttl, stale_ttl in RESPONSE_CACHE_POLICIES:
+            if pattern in path:
+                return ttl, stale_ttl
+        return self._reuse_window, 0
+
+    async def _request(
+        self,
+        endpoint: str,
+        priority: int = PRIORITY_BACKGROUND,
+        stream: tuple[str, int, tuple[str, ...]] | None = None,
+        expected_status: int | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Effectuer une requête à l'API.
+
+        Les appels simultanés vers la même URL partagent une seule requête HTTP.
+        Une réponse en cache encore valide est réutilisée telle quelle ; une
+        réponse expirée depuis peu est servie pendant que la requête est
+        refaite en arrière-plan (selon RESPONSE_CACHE_POLICIES). Les nouvelles
+        requêtes passent par le limiteur de débit selon leur priorité.
+
+        Args:
+            endpoint: Chemin relatif à l'URL de l'API
+            priority: Priorité de la requête pour le limiteur de débit
+            stream: (clé, limite, champs) pour ne décoder progressivement que
+                les `limite` premiers objets du tableau `clé`, réduits à
+                `champs`. La réponse vaut alors {clé: [...]}.
+            expected_status: Status d'échec attendu par l'appelant (ex: 404
+                pour vérifier un ID), journalisé en debug seulement
+        """
+        url = f"{self.base_url}/{endpoint}"
+        key = self._normalize_url(url)
+        if stream is not None:
+            key = f"{key}#{stream[0]}:{stream[1]}"
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            age = time.monotonic() - cached.fetched_at
+            if age < cached.ttl:
+                self.metrics.endpoint(_endpoint_family(url)).cache_hits += 1
+                return cached.data
+            if age < cached.ttl + cached.stale_ttl:
+                # Servir la réponse expirée et la revalider en arrière-plan
+                self.metrics.endpoint(_endpoint_family(url)).stale_served += 1
+                self._start_fetch(key, url, priority, stream, expected_status)
+                return cached.data
+
+        # shield: l'annulation d'un appelant n'annule pas la requête partagée
+        return await asyncio.shield(
+            self._start_fetch(key, url, priority, stream, expected_status)
+        )
+
+    def _start_fetch(
+        self,
+        key: str,
+        url: str,
+        priority: int,
+        stream: tuple[str, int, tuple[str, ...]] | None,
+        expected_status: int | None = None,
+    ) -> asyncio.Task[dict[str, Any] | None]:
+        """Lancer la requête d'une URL, ou rejoindre celle déjà en cours."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch(key, url, priority, stream, expected_status)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    def _store_response(
+        self,
+        key: str,
+        url: str,
+        data: dict[str, Any],
+        headers: Mapping[str, str],
+        size: int,
+    ) -> None:
+        """Garder une réponse en cache selon la politique de l'URL et Cache-Control."""
+        ttl, stale_ttl = self._cache_policy(url)
+        max_age, no_store = _parse_cache_control(headers.get("Cache-Control"))
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if no_store or (
+            ttl <= 0 and stale_ttl <= 0 and etag is None and last_modified is None
+        ):
+            self._cache.pop(key, None)
+            return
+
+        now = time.monotonic()
+        self._cache[key] = _CachedResponse(
+            data, now, ttl, stale_ttl, etag, last_modified, size
+        )
+        # Purger les réponses inutilisables : expirées, hors revalidation, et
+        # sans validateur (ou conservées trop longtemps)
+        for stale_key in [
+            k
+            for k, entry in self._cache.items()
+            if now - entry.fetched_at >= entry.ttl + entry.stale_ttl
+            and (
+                (entry.etag is None and entry.last_modified is None)
+                or now - entry.fetched_at >= RESPONSE_CACHE_RETENTION
+            )
+        ]:
+            del self._cache[stale_key]
+
+    @staticmethod
+    def _count_bytes(
+        metrics: EndpointMetrics,
+        response: aiohttp.ClientResponse,
+        read_size: int,
+        complete: bool,
+    ) -> int:
+        """
+        Comptabiliser le volume d'une réponse.
+
+        Le volume réel est la taille compressée annoncée (Content-Length)
+        quand le corps compressé a été lu en entier, sinon la taille lue.
+
+        Returns:
+            Taille de la réponse complète non compressée (estimée si le
+            corps n'a pas été lu en entier)
+        """
+        compressed = bool(response.headers.get("Content-Encoding"))
+        wire_size = read_size
+        if compressed and complete and response.content_length:
+            wire_size = response.content_length
+        full_size = read_size
+        if not complete and not compressed and response.content_length:
+            full_size = response.content_length
+        metrics.bytes_on_wire += wire_size
+        metrics.bytes_without_savings += full_size
+        return full_size
+
+    def _breaker(self, family: str) -> CircuitBreaker:
+        """Disjoncteur d'une famille de requêtes."""
+        breaker = self.breakers.get(family)
+        if breaker is None:
+            breaker = self.breakers[family] = CircuitBreaker(family)
+        return breaker
+
+    async def _fetch(
+        self,
+        key: str,
+        url: str,
+        priority: int,
+        stream: tuple[str, int, tuple[str, ...]] | None = None,
+        expected_status: int | None = None,
+    ) -> dict[str, Any] | None:
+        """
+        Exécuter la requête si le disjoncteur de sa famille le permet.
+
+        Tant que le disjoncteur est ouvert, aucune requête n'est envoyée et
+        la dernière réponse valide est servie : celle du cache, sinon la
+        dernière reçue pour cette requête (même sans validateur HTTP).
+        """
+        family = _endpoint_family(url)
+        breaker = self._breaker(family)
+        cached = self._cache.get(key)
+        last_good = cached.data if cached is not None else self._last_good.get(key)
+        if not breaker.allow():
+            if last_good is not None:
+                return last_good
+            self._errors[key] = breaker.last_error or ERROR_NETWORK
+            return None
+
+        try:
+            data, error = await self._send(
+                key,
+                url,
+                priority,
+                stream,
+                cached,
+                self.metrics.endpoint(family),
+                expected_status,
+            )
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+
+        if error is None:
+            breaker.record_success()
+            self._errors.pop(key, None)
+            if family in LAST_GOOD_FAMILIES:
+                self._remember(key, data)
+            return data
+        self._errors[key] = error
+        if error in OUTAGE_ERRORS:
+            breaker.record_failure(error)
+        else:
+            breaker.release()
+        if breaker.state != STATE_CLOSED:
+            return last_good
+        return None
+
+    def _remember(self, key: str, data: dict[str, Any] | None) -> None:
+        """Garder la dernière réponse valide d'une requête (les plus anciennes sont oubliées)."""
+        if data is None:
+            return
+        self._last_good[key] = data
+        self._last_good.move_to_end(key)
+        while len(self._last_good) > LAST_GOOD_MAX_RESPONSES:
+            self._last_good.popitem(last=False)
+
+    async def _send(
+        self,
+        key: str,
+        url: str,
+        priority: int,
+        stream: tuple[str, int, tuple[str, ...]] | None,
+        cached: _CachedResponse | None,
+        metrics: EndpointMetrics,
+        expected_status: int | None = None,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        Envoyer la requête HTTP (conditionnelle si possible) une fois autorisée par le limiteur.
+
+        Returns:
+            (réponse, None) en cas de succès, sinon (None, type d'erreur)
+        """
+        if not await self.rate_limiter.acquire(priority):
+            _LOGGER.warning(
+                "Requête vers %s non envoyée: quota PRIM épuisé ou suspendu "
+                "(%s requêtes restantes aujourd'hui)",
+                url,
+                self.rate_limiter.remaining_daily,
+            )
+            return None, ERROR_QUOTA
+
+        headers = self._headers
+        if cached is not None and (cached.etag or cached.last_modified):
+            headers = dict(headers)
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        start = time.perf_counter()
+        data, error, status = await self._get(
+            key, url, headers, stream, cached, metrics, expected_status
+        )
+        metrics.observe(status, error, time.perf_counter() - start)
+        return data, error
+
+    async def _get(
+        self,
+        key: str,
+        url: str,
+        headers: dict[str, str],
+        stream: tuple[str, int, tuple[str, ...]] | None,
+        cached: _CachedResponse | None,
+        metrics: EndpointMetrics,
+        expected_status: int | None = None,
+    ) -> tuple[dict[str, Any] | None, str | None, int | None]:
+        """
+        Exécuter la requête HTTP.
+
+        Returns:
+            (réponse ou None, type d'erreur ou None, status HTTP ou None)
+        """
         try:
             session = await self._get_session()
-            async with session.get(url, headers=self._headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    return await response.json()
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                status = response.status
+                if status == 200:
+                    if stream is not None:
+                        data, read_size, complete = await self._read_stream(
+                            response, *stream
+                        )
+                    else:
+                        body = await response.read()
+                        data = json.loads(body)
+                        read_size, complete = len(body), True
+                    full_size = self._count_bytes(metrics, response, read_size, complete)
+                    self._store_response(key, url, data, response.headers, full_size)
+                    return data, None, status
+                elif status == 304 and cached is not None:
+                    # Inchangée : la réponse en cache redevient valide
+                    metrics.not_modified += 1
+                    metrics.bytes_without_savings += cached.size
+                    self._store_response(key, url, cached.data, response.headers, cached.size)
+                    return cached.data, None, status
+
+                error = error_for_status(status)
+                if error == ERROR_QUOTA:
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    self.rate_limiter.defer(retry_after)
+                    _LOGGER.warning(
+                        "Quota API IDFM dépassé pour %s, nouvel essai dans %.0f s",
+                        url,
+                        retry_after,
+                    )
+                elif error == ERROR_AUTH:
+                    _LOGGER.error(
+                        "API key IDFM refusée (status %s) pour %s", response.status, url
+                    )
+                elif error == ERROR_SERVER:
+                    # Les pannes sont signalées par le disjoncteur
+                    _LOGGER.debug("Erreur serveur API IDFM: status %s pour %s", response.status, url)
+                elif status == expected_status:
+                    _LOGGER.debug("Status %s attendu pour %s", status, url)
                 else:
                     _LOGGER.error("Erreur API IDFM: status %s pour %s", response.status, url)
-                    return None
+                return None, error, status
         except asyncio.TimeoutError:
-            _LOGGER.error("Timeout lors de la requête à %s", url)
-            return None
+            _LOGGER.debug("Timeout lors de la requête à %s", url)
+            return None, ERROR_TIMEOUT, None
+        except aiohttp.ClientError as e:
+            _LOGGER.debug("Erreur réseau lors de la requête à %s: %s", url, e)
+            return None, ERROR_NETWORK, None
+        except ValueError as e:
+            _LOGGER.debug("Réponse illisible de %s: %s", url, e)
+            return None, ERROR_SERVER, None
         except Exception as e:
             _LOGGER.error("Erreur lors de la requête à %s: %s", url, e)
-            return None
+            return None, ERROR_NETWORK, None
+
+    @staticmethod
+    async def _read_stream(
+        response: aiohttp.ClientResponse,
+        key: str,
+        limit: int,
+        fields: tuple[str, ...],
+    ) -> tuple[dict[str, Any], int, bool]:
+        """
+        Lire le corps par morceaux et n'en décoder que le tableau `key`.
+
+        La lecture s'arrête dès que `limit` objets ont été extraits : le reste
+        du corps n'est ni téléchargé ni décodé.
 
-    async def async_get_line_traffic(self, line_id: str) -> dict[str, Any] | None:
+        Returns:
+            ({key: [...]}, octets lus, True si le corps a été lu en entier)
+        """
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")()
+        array = JSONArrayStream(key, limit, fields)
+        size = 0
+
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            size += len(chunk)
+            array.feed(decoder.decode(chunk))
+            if array.done:
+                break
+
+        return {key: array.items}, size, response.content.at_eof()
+
+    async def async_get_line_traffic(
+        self, line_id: str, priority: int = PRIORITY_TRAFFIC
+    ) -> dict[str, Any] | None:
         """
         Récupérer les infos trafic d'une ligne.
         
         Args:
             line_id: ID de la ligne (ex: "line:IDFM:C01742" pour RER A)
+            priority: Priorité de la requête pour le limiteur de débit
         
         Returns:
             Informations de trafic de la ligne
         """
         endpoint = f"line_reports/lines/{line_id}/line_reports?"
-        return await self._request(endpoint)
+        return await self._request(endpoint, priority)
 
     async def async_get_station_departures(
         self, 
         stop_area_id: str, 
-        count: int = 5
+        count: int = 5,
+        priority: int = PRIORITY_DEPARTURES,
+        query: DepartureQuery | None = None,
     ) -> dict[str, Any] | None:
         """
         Récupérer les prochains départs d'une station.
         
         Args:
             stop_area_id: ID de la station (ex: "stop_area:IDFM:...")
-            count: Nombre de départs à récupérer
+            count: Nombre de départs à récupérer (sans `query`)
+            priority: Priorité de la requête pour le limiteur de débit
+            query: Filtres transmis à l'API (lignes, modes, horizon...)
         
         Returns:
-            Prochains départs de la station
+            Prochains départs de la station (les directions ne sont pas
+            filtrées : voir DepartureQuery.select)
         """
-        endpoint = f"stop_areas/{stop_area_id}/departures"
-        return await self._request(endpoint)
+        if query is None:
+            query = DepartureQuery(count=count)
+        endpoint = _departures_endpoint(stop_area_id, query)
+        return await self._request(
+            endpoint,
+            priority,
+            stream=("departures", query.request_count, DEPARTURE_FIELDS),
+        )
 
-    async def async_get_station_traffic(self, stop_area_id: str) -> dict[str, Any] | None:
+    async def async_get_all_line_reports(
+        self, priority: int = PRIORITY_TRAFFIC
+    ) -> dict[str, Any] | None:
         """
-        Récupérer les infos trafic affectant une station.
-        
+        Récupérer les infos trafic de tout le réseau en une seule requête.
+
+        Les pages suivantes sont demandées jusqu'à la dernière d'après le bloc
+        `pagination` de chaque réponse : une page en erreur fait échouer toute
+        la requête, pour ne jamais découper des infos trafic tronquées.
+
         Args:
-            stop_area_id: ID de la station
-        
+            priority: Priorité de la requête pour le limiteur de débit
+
         Returns:
-            Informations de trafic de la station
+            Rapports de trafic de toutes les lignes perturbées, à découper
+            avec IDFMTrafficParser.split_line_reports ; None en cas d'erreur
         """
-        # L'API IDFM peut retourner les perturbations par station
-        endpoint = f"traffic_reports/{stop_area_id}"
-        return await self._request(endpoint)
+        line_reports: list[dict[str, Any]] = []
+        disruptions: dict[str, dict[str, Any]] = {}
+        page = 0
+
+        while True:
+            endpoint = f"coverage/fr-idf/line_reports?count={BULK_LINE_REPORTS_COUNT}"
+            if page:
+                endpoint += f"&start_page={page}"
+            result = await self._request(endpoint, priority)
+            if result is None:
+                if page:
+                    _LOGGER.warning(
+                        "Infos trafic du réseau incomplètes (page %d en erreur)", page
+                    )
+                return None
+
+            line_reports.extend(result.get("line_reports", []))
+            # Une perturbation peut être référencée depuis plusieurs pages
+            for disruption in result.get("disruptions", []):
+                disruptions.setdefault(disruption.get("id"), disruption)
+
+            page += 1
+            if _is_last_page(result, "line_reports"):
+                return {
+                    "line_reports": line_reports,
+                    "disruptions": list(disruptions.values()),
+                }
 
     async def async_search_stations(self, query: str) -> list[dict[str, Any]]:
         """
@@ -106,31 +710,469 @@ class IDFMApiClient:
         Returns:
             Liste des stations correspondantes
         """
-        endpoint = f"coverage/fr-idf/places?q={query}&type[]=stop_area"
+        endpoint = f"coverage/fr-idf/places?q={quote(query)}&type[]=stop_area"
         result = await self._request(endpoint)
         
         if result and "places" in result:
             return result["places"]
         return []
 
-    async def async_get_all_data(self) -> dict[str, Any]:
+    async def async_check_api_key(self) -> str | None:
+        """
+        Vérifier l'API key avec une requête minimale (fiche d'une ligne, sans détails).
+
+        Returns:
+            None si l'API a répondu avec cette clé, sinon le type d'erreur
+            (ERROR_AUTH si la clé est refusée, une panne sinon)
+        """
+        endpoint = f"coverage/fr-idf/lines/{API_KEY_PROBE_LINE}?depth=0&disable_geojson=true"
+        if await self._request(endpoint) is not None:
+            return None
+        return self._errors.get(
+            self._normalize_url(f"{self.base_url}/{endpoint}"), ERROR_NETWORK
+        )
+
+    async def async_get_stop_area(
+        self, stop_area_id: str
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """
+        Récupérer la fiche d'une station et les lignes qui la desservent.
+
+        Args:
+            stop_area_id: ID de la station
+
+        Returns:
+            (station (nom, libellé, lignes), None) si elle existe,
+            (None, None) si elle est inconnue (404 ou réponse vide),
+            (None, type d'erreur) si l'API n'a pas pu répondre
+        """
+        endpoint = (
+            f"coverage/fr-idf/stop_areas/{quote(stop_area_id, safe=':')}"
+            "?depth=2&disable_geojson=true"
+        )
+        # Une station inconnue répond 404 : attendu ici, pas une erreur
+        result = await self._request(endpoint, expected_status=404)
+        if result is None:
+            error = self._errors.get(self._normalize_url(f"{self.base_url}/{endpoint}"))
+            if error == ERROR_CLIENT:
+                return None, None
+            return None, error or ERROR_NETWORK
+        if result.get("stop_areas"):
+            return result["stop_areas"][0], None
+        return None, None
+
+    async def async_get_all_stop_areas(self) -> dict[str, tuple[str, str]]:
+        """
+        Récupérer la liste complète des stations du réseau (pages successives).
+
+        Returns:
+            {stop_area_id: (nom, libellé avec commune)}, vide en cas d'erreur
+        """
+        stop_areas: dict[str, tuple[str, str]] = {}
+        page = 0
+
+        while True:
+            endpoint = (
+                f"coverage/fr-idf/stop_areas?count={STOP_AREA_PAGE_SIZE}"
+                f"&start_page={page}&depth=0&disable_geojson=true"
+            )
+            result = await self._request(endpoint)
+            if not result:
+                _LOGGER.warning("Téléchargement de la liste des stations interrompu (page %d)", page)
+                return {}
+
+            for stop_area in result.get("stop_areas", []):
+                name = stop_area.get("name", "")
+                stop_areas[stop_area["id"]] = (name, stop_area.get("label", name))
+
+            page += 1
+            if _is_last_page(result, "stop_areas"):
+                return stop_areas
+
+    async def async_get_all_lines(self) -> list[dict[str, Any]]:
+        """
+        Récupérer la liste complète des lignes du réseau (pages successives).
+
+        Returns:
+            Liste des lignes (id, code, nom, couleur, mode commercial), vide en cas d'erreur
         """
-        Méthode pour le coordinateur - récupère toutes les données nécessaires.
-        À personnaliser selon la configuration de l'utilisateur.
+        lines: list[dict[str, Any]] = []
+        page = 0
+
+        while True:
+            endpoint = (
+                f"coverage/fr-idf/lines?count={LINE_PAGE_SIZE}"
+                f"&start_page={page}&depth=0&disable_geojson=true"
+            )
+            result = await self._request(endpoint)
+            if not result:
+                _LOGGER.warning("Téléchargement de la liste des lignes interrompu (page %d)", page)
+                return []
+
+            lines.extend(
+                {
+                    "id": line.get("id"),
+                    "code": line.get("code"),
+                    "name": line.get("name"),
+                    "color": line.get("color"),
+                    "commercial_mode": line.get("commercial_mode", {}),
+                }
+                for line in result.get("lines", [])
+            )
+
+            page += 1
+            if _is_last_page(result, "lines"):
+                return lines
+
+    async def async_get_all_data(
+        self,
+        lines: list[str],
+        stations: list[str],
+        departures_count: int = DEFAULT_DEPARTURES_COUNT,
+        imminent_stations: set[str] | None = None,
+        deadline: float | None = None,
+        station_queries: dict[str, DepartureQuery] | None = None,
+        traffic_stations: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Méthode pour le coordinateur - récupère toutes les données en un lot.
+
+        Les lignes et les stations sont interrogées en parallèle (avec une
+        limite de requêtes simultanées), puis parsées une seule fois. Les
+        requêtes sont lancées par ordre de priorité : départs imminents,
+        autres départs, puis infos trafic.
+
+        À partir de BULK_LINE_REPORTS_THRESHOLD lignes, ou dès que les infos
+        trafic de stations sont demandées, les infos trafic sont récupérées en
+        une seule requête pour tout le réseau puis découpées localement par
+        ligne et par station (index inversé des perturbations).
+
+        Args:
+            lines: IDs des lignes pour les infos trafic
+            stations: IDs des stations pour les prochains départs
+            departures_count: Nombre de départs à récupérer par station
+            imminent_stations: Stations dont le prochain départ est proche
+            deadline: Durée maximale (secondes) du lot ; les requêtes non
+                terminées à l'échéance sont abandonnées par ce lot (une
+                requête partagée se poursuit et sa réponse sera réutilisée)
+            station_queries: Filtres des départs par station ; les autres
+                stations demandent `departures_count` départs sans filtre
+            traffic_stations: IDs des stations pour les infos trafic
+
+        Returns:
+            {
+                "lines": {line_id: <parse_line_reports>},
+                "stations": {stop_area_id: <parse_departures>},
+                "station_traffic": {stop_area_id: <parse_line_reports>},
+            }
+            Les ressources en erreur sont absentes du résultat.
         """
-        # Cette méthode sera appelée par le coordinateur
-        # Pour l'instant, retourne un dict vide
-        return {}
+        imminent_stations = imminent_stations or set()
+        station_queries = station_queries or {}
+        default_query = DepartureQuery(count=departures_count)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        traffic_stations = traffic_stations or []
+        bulk_lines = len(lines) >= BULK_LINE_REPORTS_THRESHOLD or bool(traffic_stations)
+
+        jobs: list[tuple[int, str, str]] = [
+            (
+                PRIORITY_DEPARTURES_IMMINENT
+                if stop_area_id in imminent_stations
+                else PRIORITY_DEPARTURES,
+                "stations",
+                stop_area_id,
+            )
+            for stop_area_id in stations
+        ]
+        if bulk_lines:
+            jobs.append((PRIORITY_TRAFFIC, "network", ""))
+        else:
+            jobs.extend((PRIORITY_TRAFFIC, "lines", line_id) for line_id in lines)
+        jobs.sort(key=lambda job: job[0])
+
+        async def _bounded(priority: int, kind: str, key: str) -> dict[str, Any] | None:
+            async with semaphore:
+                if kind == "network":
+                    return await self.async_get_all_line_reports(priority)
+                if kind == "lines":
+                    return await self.async_get_line_traffic(key, priority)
+                return await self.async_get_station_departures(
+                    key, priority=priority, query=station_queries.get(key, default_query)
+                )
+
+        tasks = [asyncio.create_task(_bounded(*job)) for job in jobs]
+        if not tasks:
+            return {"lines": {}, "stations": {}, "station_traffic": {}}
+
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        if pending:
+            _LOGGER.debug(
+                "%d requête(s) non terminée(s) après %s s, ignorées pour ce lot",
+                len(pending),
+                deadline,
+            )
+            for task in pending:
+                task.cancel()
+
+        data: dict[str, Any] = {"lines": {}, "stations": {}, "station_traffic": {}}
+
+        for (_, kind, key), task in zip(jobs, tasks):
+            if task in pending or task.exception() is not None or task.result() is None:
+                _LOGGER.debug("Pas de données pour %s", key)
+                continue
+            result = task.result()
+            start = time.perf_counter()
+            if kind == "network":
+                for line_id, reports in IDFMTrafficParser.split_line_reports(
+                    result, lines
+                ).items():
+                    data["lines"][line_id] = IDFMTrafficParser.parse_line_reports(reports)
+                for stop_area_id, reports in IDFMTrafficParser.index_stop_area_disruptions(
+                    result, traffic_stations
+                ).items():
+                    data["station_traffic"][stop_area_id] = (
+                        IDFMTrafficParser.parse_line_reports(reports)
+                    )
+            elif kind == "lines":
+                data["lines"][key] = IDFMTrafficParser.parse_line_reports(result)
+            else:
+                data["stations"][key] = station_queries.get(key, default_query).select(
+                    IDFMTrafficParser.parse_departures(result)
+                )
+            self.metrics.observe_parse(kind, time.perf_counter() - start)
+
+        return data
+
+    def diagnostics(self) -> dict[str, Any]:
+        """État du client pour les diagnostics Home Assistant."""
+        return {
+            "base_url": self.base_url,
+            "rate_limiter": {
+                "daily_quota": self.rate_limiter.daily_quota,
+                "used_today": self.rate_limiter.used_today,
+                "deferred_for": round(self.rate_limiter.deferred_for),
+            },
+            "breakers": {
+                family: {
+                    "state": breaker.state,
+                    "failures": breaker.failures,
+                    "last_error": breaker.last_error,
+                    "retry_in": round(breaker.retry_in),
+                }
+                for family, breaker in sorted(self.breakers.items())
+            },
+            "cached_responses": len(self._cache),
+            "last_good_responses": len(self._last_good),
+            "inflight_requests": len(self._inflight),
+            **self.metrics.as_dict(),
+        }
 
     async def close(self) -> None:
-        """Fermer la session aiohttp."""
-        if self.session and not self.session.closed:
+        """Fermer la session aiohttp si elle a été créée par le client."""
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        self._cache.clear()
+        self._last_good.clear()
+        self._errors.clear()
+        if self._owns_session and self.session and not self.session.closed:
             await self.session.close()
 
 
 class IDFMTrafficParser:
     """Parser pour les données de trafic IDFM."""
 
+    @staticmethod
+    def split_line_reports(
+        data: dict[str, Any], line_ids: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Découper les rapports de trafic du réseau par ligne.
+
+        Les perturbations sont rattachées aux lignes via les liens des
+        line_reports et via leurs impacted_objects (ligne, tronçon ou itinéraire).
+
+        Returns:
+            {line_id: {"disruptions": [...]}} pour chaque ligne demandée,
+            au format attendu par parse_line_reports
+        """
+        wanted = set(line_ids)
+        # id de perturbation -> lignes demandées qui y font référence
+        linked_lines: dict[str, set[str]] = {}
+
+        for report in data.get("line_reports", []):
+            line_id = report.get("line", {}).get("id")
+            if line_id not in wanted:
+                continue
+            for obj in [report.get("line", {}), *report.get("pt_objects", [])]:
+                for link in obj.get("links", []):
+                    if link.get("type") == "disruption" and link.get("id"):
+                        linked_lines.setdefault(link["id"], set()).add(line_id)
+
+        by_line: dict[str, list[dict[str, Any]]] = {line_id: [] for line_id in line_ids}
+
+        for disruption in data.get("disruptions", []):
+            impacted_lines = set(linked_lines.get(disruption.get("id"), ()))
+            for impacted in disruption.get("impacted_objects", []):
+                pt_object = impacted.get("pt_object", {})
+                impacted_lines.update(
+                    candidate
+                    for candidate in (
+                        pt_object.get("id"),
+                        pt_object.get("line_section", {}).get("line", {}).get("id"),
+                        pt_object.get("route", {}).get("line", {}).get("id"),
+                    )
+                    if candidate in wanted
+                )
+            for line_id in impacted_lines:
+                by_line[line_id].append(disruption)
+
+        return {
+            line_id: {"disruptions": disruptions}
+            for line_id, disruptions in by_line.items()
+        }
+
+    @staticmethod
+    def index_stop_area_disruptions(
+        data: dict[str, Any], stop_area_ids: list[str]
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Index inversé station -> perturbations, depuis les rapports de trafic.
+
+        Une perturbation concerne une station lorsque la station (ou l'un de
+        ses points d'arrêt) figure dans ses impacted_objects : objet impacté,
+        extrémité d'un tronçon ou arrêt impacté.
+
+        Returns:
+            {stop_area_id: {"disruptions": [...]}} pour chaque station
+            demandée, au format attendu par parse_line_reports
+        """
+        wanted = set(stop_area_ids)
+        by_stop_area: dict[str, list[dict[str, Any]]] = {
+            stop_area_id: [] for stop_area_id in stop_area_ids
+        }
+
+        for disruption in data.get("disruptions", []):
+            impacted_stop_areas: set[str] = set()
+            for impacted in disruption.get("impacted_objects", []):
+                pt_object = impacted.get("pt_object", {})
+                line_section = pt_object.get("line_section", {})
+                candidates = [
+                    pt_object.get("id"),
+                    pt_object.get("stop_point", {}).get("stop_area", {}).get("id"),
+                    line_section.get("from", {}).get("id"),
+                    line_section.get("to", {}).get("id"),
+                ]
+                candidates.extend(
+                    stop.get("stop_point", {}).get("stop_area", {}).get("id")
+                    for stop in impacted.get("impacted_stops", [])
+                )
+                impacted_stop_areas.update(
+                    candidate for candidate in candidates if candidate in wanted
+                )
+            for stop_area_id in impacted_stop_areas:
+                by_stop_area[stop_area_id].append(disruption)
+
+        return {
+            stop_area_id: {"disruptions": disruptions}
+            for stop_area_id, disruptions in by_stop_area.items()
+        }
+
+    # Perturbations déjà parsées, par (id, updated_at, status), en ordre LRU
+    _disruption_cache: OrderedDict[
+        tuple[str, str, str], tuple[str, dict[str, Any] | None] | None
+    ] = OrderedDict()
+
+    @staticmethod
+    def _parse_disruption_cached(
+        disruption: dict[str, Any],
+    ) -> tuple[str, dict[str, Any] | None] | None:
+        """
+        Parser une perturbation en réutilisant le résultat d'un cycle précédent.
+
+        Une perturbation non modifiée (même id, updated_at et statut) renvoie
+        le même objet message qu'au cycle précédent, qui ne doit donc pas être
+        modifié par l'appelant.
+        """
+        disruption_id = disruption.get("id")
+        if not disruption_id:
+            return IDFMTrafficParser._parse_disruption(decode_disruption(disruption))
+
+        cache = IDFMTrafficParser._disruption_cache
+        key = (
+            disruption_id,
+            disruption.get("updated_at", ""),
+            disruption.get("status", ""),
+        )
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        parsed = IDFMTrafficParser._parse_disruption(decode_disruption(disruption))
+        cache[key] = parsed
+        if len(cache) > DISRUPTION_CACHE_SIZE:
+            cache.popitem(last=False)
+        return parsed
+
+    @staticmethod
+    def _parse_disruption(
+        disruption: Disruption | None,
+    ) -> tuple[str, dict[str, Any] | None] | None:
+        """
+        Parser une perturbation décodée.
+
+        Returns:
+            (sévérité, message ou None), ou None si la perturbation est
+            invalide, inactive ou ne concerne qu'un équipement
+        """
+        # Vérifier que la perturbation est active
+        if disruption is None or disruption.status != "active":
+            return None
+        
+        # Filtrer les perturbations d'équipements (ascenseurs, escalators, etc.)
+        if any(tag in EQUIPMENT_TAGS for tag in disruption.tags):
+            _LOGGER.debug("Filtering out equipment disruption: %s", disruption.tags)
+            return None
+        
+        # Mapper les sévérités
+        severity_effect = disruption.effect
+        if severity_effect in ["NO_SERVICE", "REDUCED_SERVICE", "SIGNIFICANT_DELAYS"]:
+            severity = "blocking"
+        elif severity_effect in ["DETOUR", "MODIFIED_SERVICE", "OTHER_EFFECT"]:
+            severity = "perturbation"
+        else:
+            severity = "information"
+        
+        # Extraire les messages
+        title = ""
+        message_text = ""
+        
+        for channel_name, text in disruption.messages:
+            # Priorité: titre pour le titre, moteur/email pour le message détaillé
+            if channel_name == "titre" and not title:
+                title = text
+            elif channel_name in ["moteur", "email"] and not message_text:
+                message_text = html_to_text(text)
+            elif channel_name == "notification" and not title:
+                title = text
+        
+        if not title and not message_text:
+            return severity, None
+        
+        return severity, {
+            "title": title or "Perturbation",
+            "message": message_text or title,
+            "severity": severity,
+            "category": disruption.category,
+            "cause": disruption.cause,
+            "updated_at": disruption.updated_at,
+        }
+
     @staticmethod
     def parse_line_reports(data: dict[str, Any]) -> dict[str, Any]:
         """
@@ -166,31 +1208,10 @@ class IDFMTrafficParser:
             }
         
         for disruption in disruptions:
-            # Vérifier que la perturbation est active
-            status = disruption.get("status")
-            if status != "active":
+            parsed = IDFMTrafficParser._parse_disruption_cached(disruption)
+            if parsed is None:
                 continue
-            
-            # Filtrer les perturbations d'équipements (ascenseurs, escalators, etc.)
-            tags = disruption.get("tags", [])
-            is_equipment = any(tag in ["Ascenseur", "Escalator", "Escalier mécanique", "Escalier"] for tag in tags)
-            
-            if is_equipment:
-                _LOGGER.debug("Filtering out equipment disruption: %s", tags)
-                continue
-            
-            # Récupérer la sévérité
-            severity_obj = disruption.get("severity", {})
-            severity_name = severity_obj.get("name", "information")
-            severity_effect = severity_obj.get("effect", "")
-            
-            # Mapper les sévérités
-            if severity_effect in ["NO_SERVICE", "REDUCED_SERVICE", "SIGNIFICANT_DELAYS"]:
-                severity = "blocking"
-            elif severity_effect in ["DETOUR", "MODIFIED_SERVICE", "OTHER_EFFECT"]:
-                severity = "perturbation"
-            else:
-                severity = "information"
+            severity, message = parsed
             
             # Déterminer la sévérité maximale
             if severity == "blocking":
@@ -198,38 +1219,8 @@ class IDFMTrafficParser:
             elif severity == "perturbation" and max_severity != "blocking":
                 max_severity = "perturbation"
             
-            # Extraire les messages
-            disruption_messages = disruption.get("messages", [])
-            title = ""
-            message_text = ""
-            
-            for msg in disruption_messages:
-                channel = msg.get("channel", {})
-                channel_name = channel.get("name", "")
-                text = msg.get("text", "")
-                
-                # Priorité: titre pour le titre, moteur/email pour le message détaillé
-                if channel_name == "titre" and not title:
-                    title = text
-                elif channel_name in ["moteur", "email"] and not message_text:
-                    # Nettoyer le HTML
-                    import re
-                    clean_text = re.sub('<[^<]+?>', '', text)
-                    clean_text = clean_text.replace('&#232;', 'è').replace('&#233;', 'é')
-                    clean_text = clean_text.replace('&#224;', 'à').replace('&nbsp;', ' ')
-                    message_text = clean_text.strip()
-                elif channel_name == "notification" and not title:
-                    title = text
-            
-            if title or message_text:
-                messages.append({
-                    "title": title or "Perturbation",
-                    "message": message_text or title,
-                    "severity": severity,
-                    "category": disruption.get("category", ""),
-                    "cause": disruption.get("cause", ""),
-                    "updated_at": disruption.get("updated_at", ""),
-                })
+            if message is not None:
+                messages.append(message)
 
         # Déterminer le statut global
         if max_severity == "blocking":
@@ -247,57 +1238,81 @@ class IDFMTrafficParser:
         }
 
     @staticmethod
-    def parse_departures(data: dict[str, Any]) -> list[dict[str, Any]]:
+    def parse_departures(data: dict[str, Any]) -> list[Departure]:
         """
         Parser les prochains départs.
         
         Returns:
             [
-                {
-                    "line": "RER A",
-                    "direction": "Cergy",
-                    "departure_time": datetime,
-                    "time_remaining": "3 min",
-                    "platform": "1",
-                }
+                Departure(
+                    line="RER A",
+                    direction="Cergy",
+                    departure_time="2024-01-01T08:03:00+01:00",
+                    time_remaining="3 min",
+                    platform="1",
+                    ...
+                )
             ]
         """
-        if not data or "departures" not in data:
+        if not data or not isinstance(data.get("departures"), list):
             return []
 
+        # Un seul instant de référence pour tous les départs
+        now = time.time()
         departures = []
-        
-        for departure in data.get("departures", []):
-            stop_date_time = departure.get("stop_date_time", {})
-            display_info = departure.get("display_informations", {})
-            
-            # Heure de départ
-            departure_dt_str = stop_date_time.get("departure_date_time")
-            if departure_dt_str:
-                departure_dt = datetime.strptime(departure_dt_str, "%Y%m%dT%H%M%S")
-            else:
+        for raw in data["departures"]:
+            departure = decode_departure(raw, now)
+            if departure is not None:
+                departures.append(departure)
+
+        return sorted(departures, key=lambda x: x.departure_timestamp)
+
+    @staticmethod
+    def format_time_remaining(seconds: float) -> str:
+        """Formater le temps restant avant un départ ("À l'approche", "3 min")."""
+        return format_time_remaining(seconds)
+
+    @staticmethod
+    def group_departures(
+        departures: list[Departure], limit: int
+    ) -> dict[tuple[str, str], list[Departure]]:
+        """
+        Répartir des départs par (code de ligne, direction), en une passe.
+
+        Les départs étant triés, chaque groupe garde ses `limit` premiers.
+        """
+        groups: dict[tuple[str, str], list[Departure]] = {}
+        for departure in departures:
+            group = groups.setdefault((departure.line_code, departure.direction), [])
+            if len(group) < limit:
+                group.append(departure)
+        return groups
+
+    @staticmethod
+    def refresh_departures(
+        departures: list[Departure], now: float | None = None
+    ) -> list[Departure]:
+        """
+        Recalculer localement les temps restants, sans nouvelle requête.
+
+        Les départs passés depuis plus de DEPARTED_GRACE secondes sont retirés.
+        Les départs dont le temps restant n'a pas changé sont conservés tels
+        quels (même objet), ce qui permet de détecter l'absence de changement.
+
+        Args:
+            departures: Départs issus de parse_departures
+            now: Horodatage de référence (par défaut, l'instant présent)
+        """
+        now = time.time() if now is None else now
+        refreshed = []
+
+        for departure in departures:
+            remaining = departure.departure_timestamp - now
+            if remaining < -DEPARTED_GRACE:
                 continue
-            
-            # Temps restant
-            now = datetime.now()
-            time_diff = (departure_dt - now).total_seconds()
-            
-            if time_diff < 60:
-                time_remaining = "À l'approche"
-            else:
-                minutes = int(time_diff / 60)
-                time_remaining = f"{minutes} min"
-            
-            departures.append({
-                "line": display_info.get("label", ""),
-                "line_code": display_info.get("code", ""),
-                "direction": display_info.get("direction", ""),
-                "departure_time": departure_dt.isoformat(),
-                "departure_timestamp": departure_dt.timestamp(),  # Pour le tri
-                "time_remaining": time_remaining,
-                "platform": stop_date_time.get("departure_platform", ""),
-                "headsign": display_info.get("headsign", ""),
-                "network": display_info.get("network", ""),
-            })
-
-        return sorted(departures, key=lambda x: x["departure_timestamp"])
+            time_remaining = IDFMTrafficParser.format_time_remaining(remaining)
+            if time_remaining != departure.time_remaining:
+                departure = departure._replace(time_remaining=time_remaining)
+            refreshed.append(departure)
+
+        return refreshed
@@ -0,0 +1,176 @@
+"""Catalogue des lignes IDFM, chargé à la demande depuis l'API."""
+from __future__ import annotations
+
+from functools import cached_property
+from typing import Any, NamedTuple
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_LINE_CATALOG, LINE_CATALOG_TTL, LINES, TRANSPORT_TYPES
+from .idfm_api import IDFMApiClient
+from .referential import async_get_referential
+
+# Correspondance mode commercial Navitia -> type de transport (par mot-clé)
+_MODE_KEYWORDS = (
+    ("metro", "metro"),
+    ("métro", "metro"),
+    ("rer", "rer"),
+    ("rapidtransit", "rer"),
+    ("tram", "tram"),
+    ("train", "train"),
+    ("transilien", "train"),
+    ("ter", "train"),
+    ("bus", "bus"),
+)
+
+
+class LineInfo(NamedTuple):
+    """Informations d'affichage d'une ligne."""
+
+    name: str
+    code: str
+    type: str
+    color: str
+
+
+def line_type(commercial_mode: dict[str, Any]) -> str:
+    """Type de transport d'une ligne d'après son mode commercial."""
+    mode = f"{commercial_mode.get('id', '')} {commercial_mode.get('name', '')}".lower()
+    for keyword, transport_type in _MODE_KEYWORDS:
+        if keyword in mode:
+            return transport_type
+    return "other"
+
+
+def line_info_from_api(line: dict[str, Any]) -> LineInfo:
+    """Construire les informations d'une ligne depuis la réponse de l'API."""
+    code = line.get("code") or line.get("name", "")
+    transport_type = line_type(line.get("commercial_mode", {}))
+    label = TRANSPORT_TYPES.get(transport_type)
+    color = line.get("color") or "000000"
+    return LineInfo(
+        name=f"{label} {code}" if label else line.get("name", code),
+        code=code,
+        type=transport_type,
+        color=f"#{color.lstrip('#').upper()}",
+    )
+
+
+class LineCatalog:
+    """
+    Catalogue de toutes les lignes du réseau, indexé par type, code et couleur.
+
+    Les index sont construits à la première utilisation seulement.
+    """
+
+    def __init__(self, lines: dict[str, LineInfo], fetched_at: float) -> None:
+        """Initialisation du catalogue."""
+        self.lines = lines
+        self.fetched_at = fetched_at
+
+    def get(self, line_id: str) -> LineInfo | None:
+        """Informations d'une ligne."""
+        return self.lines.get(line_id)
+
+    @cached_property
+    def by_type(self) -> dict[str, dict[str, str]]:
+        """{type: {line_id: nom}} triés par nom, pour les formulaires."""
+        grouped: dict[str, dict[str, str]] = {}
+        for line_id, info in sorted(self.lines.items(), key=lambda item: item[1].name):
+            grouped.setdefault(info.type, {})[line_id] = info.name
+        return grouped
+
+    @cached_property
+    def by_code(self) -> dict[str, list[str]]:
+        """{code en minuscules: [line_id]}."""
+        index: dict[str, list[str]] = {}
+        for line_id, info in self.lines.items():
+            index.setdefault(info.code.lower(), []).append(line_id)
+        return index
+
+    @cached_property
+    def by_color(self) -> dict[str, list[str]]:
+        """{couleur: [line_id]}."""
+        index: dict[str, list[str]] = {}
+        for line_id, info in self.lines.items():
+            index.setdefault(info.color, []).append(line_id)
+        return index
+
+    def options(self, types: tuple[str, ...]) -> dict[str, str]:
+        """Lignes des types demandés, pour un sélecteur multiple."""
+        options: dict[str, str] = {}
+        for transport_type in types:
+            options.update(self.by_type.get(transport_type, {}))
+        return options
+
+    def resolve(self, text: str) -> tuple[list[str], list[str]]:
+        """
+        Résoudre une saisie libre de lignes (IDs ou codes, séparés par des virgules).
+
+        Un code partagé par plusieurs lignes (ex: bus de réseaux différents)
+        les sélectionne toutes. Les IDs complets ("line:...") sont acceptés
+        même absents du catalogue (catalogue de repli hors ligne).
+
+        Returns:
+            (IDs des lignes trouvées, saisies inconnues)
+        """
+        line_ids: list[str] = []
+        unknown: list[str] = []
+        for token in (part.strip() for part in text.split(",")):
+            if not token:
+                continue
+            if token in self.lines or token.startswith("line:"):
+                matches = [token]
+            else:
+                matches = self.by_code.get(token.lower())
+            if not matches:
+                unknown.append(token)
+                continue
+            line_ids.extend(line_id for line_id in matches if line_id not in line_ids)
+        return line_ids, unknown
+
+
+def static_line_catalog() -> LineCatalog:
+    """Catalogue de repli construit depuis les lignes principales de const.LINES."""
+    return LineCatalog(
+        {
+            line_id: LineInfo(
+                name=info["name"],
+                code=info["name"].split()[-1],
+                type=info["type"],
+                color=info["color"],
+            )
+            for line_id, info in LINES.items()
+        },
+        0.0,
+    )
+
+
+async def async_get_line_catalog(
+    hass: HomeAssistant, client: IDFMApiClient, allow_download: bool = True
+) -> LineCatalog:
+    """
+    Obtenir le catalogue des lignes partagé par toutes les entrées.
+
+    Le catalogue est chargé depuis le disque, et téléchargé si absent ou
+    expiré (sauf si `allow_download` est False). À défaut, le catalogue de
+    repli des lignes principales est utilisé.
+    """
+
+    async def _download() -> dict[str, Any]:
+        lines = await client.async_get_all_lines()
+        return {
+            line["id"]: list(line_info_from_api(line)) for line in lines if line.get("id")
+        }
+
+    catalog = await async_get_referential(
+        hass,
+        DATA_LINE_CATALOG,
+        LINE_CATALOG_TTL,
+        lambda items, fetched_at: LineCatalog(
+            {line_id: LineInfo(*values) for line_id, values in items.items()}, fetched_at
+        ),
+        _download,
+        allow_download,
+    )
+    return catalog or static_line_catalog()
@@ -0,0 +1,155 @@
+"""Mesures de performance du client API IDFM."""
+from __future__ import annotations
+
+import bisect
+from typing import Any
+
+from .const import LATENCY_BUCKETS, METRICS_EWMA_WEIGHT
+
+_BUCKET_LABELS = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+
+
+class EndpointMetrics:
+    """
+    Compteurs d'une famille de requêtes.
+
+    Chaque mesure ne coûte que quelques additions, pour rester active en
+    permanence.
+    """
+
+    __slots__ = (
+        "requests",
+        "statuses",
+        "errors",
+        "latency_buckets",
+        "latency_sum",
+        "latency_max",
+        "latency_ewma",
+        "bytes_on_wire",
+        "bytes_without_savings",
+        "cache_hits",
+        "stale_served",
+        "not_modified",
+    )
+
+    def __init__(self) -> None:
+        """Initialisation des compteurs."""
+        self.requests = 0
+        self.statuses: dict[int, int] = {}
+        self.errors: dict[str, int] = {}
+        # Un compteur par borne de LATENCY_BUCKETS, plus un au-delà
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_ewma: float | None = None
+        self.bytes_on_wire = 0
+        self.bytes_without_savings = 0
+        self.cache_hits = 0
+        self.stale_served = 0
+        self.not_modified = 0
+
+    def observe(self, status: int | None, error: str | None, latency: float) -> None:
+        """Enregistrer une requête envoyée (status None si pas de réponse)."""
+        self.requests += 1
+        if status is not None:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        self.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.latency_sum += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += METRICS_EWMA_WEIGHT * (latency - self.latency_ewma)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Compteurs sous forme sérialisable."""
+        lookups = self.requests + self.cache_hits + self.stale_served
+        return {
+            "requests": self.requests,
+            "statuses": dict(sorted(self.statuses.items())),
+            "errors": dict(sorted(self.errors.items())),
+            "latency": {
+                "mean": round(self.latency_sum / self.requests, 3) if self.requests else None,
+                "recent": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+                "max": round(self.latency_max, 3),
+                "histogram": dict(zip(_BUCKET_LABELS, self.latency_buckets)),
+            },
+            "bytes_on_wire": self.bytes_on_wire,
+            "bytes_without_savings": self.bytes_without_savings,
+            "cache": {
+                "hits": self.cache_hits,
+                "stale_served": self.stale_served,
+                "not_modified": self.not_modified,
+                "misses": self.requests - self.not_modified,
+                "hit_ratio": round(
+                    (self.cache_hits + self.stale_served + self.not_modified) / lookups, 3
+                )
+                if lookups
+                else None,
+            },
+        }
+
+
+class ClientMetrics:
+    """Mesures du client : requêtes par famille et temps de parsing."""
+
+    def __init__(self) -> None:
+        """Initialisation des mesures."""
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        # {nom: [appels, durée totale, durée max]}
+        self.parse_times: dict[str, list[float]] = {}
+
+    def endpoint(self, family: str) -> EndpointMetrics:
+        """Compteurs d'une famille de requêtes."""
+        metrics = self.endpoints.get(family)
+        if metrics is None:
+            metrics = self.endpoints[family] = EndpointMetrics()
+        return metrics
+
+    def observe_parse(self, name: str, duration: float) -> None:
+        """Enregistrer la durée d'un parsing."""
+        times = self.parse_times.get(name)
+        if times is None:
+            self.parse_times[name] = [1, duration, duration]
+            return
+        times[0] += 1
+        times[1] += duration
+        if duration > times[2]:
+            times[2] = duration
+
+    def total(self, attribute: str) -> int:
+        """Somme d'un compteur sur toutes les familles."""
+        return sum(getattr(metrics, attribute) for metrics in self.endpoints.values())
+
+    @property
+    def recent_latency(self) -> float | None:
+        """Latence récente moyenne (secondes), pondérée par le nombre de requêtes."""
+        weighted = [
+            (metrics.latency_ewma, metrics.requests)
+            for metrics in self.endpoints.values()
+            if metrics.latency_ewma is not None
+        ]
+        requests = sum(count for _, count in weighted)
+        if not requests:
+            return None
+        return sum(latency * count for latency, count in weighted) / requests
+
+    def as_dict(self) -> dict[str, Any]:
+        """Mesures sous forme sérialisable (diagnostics)."""
+        return {
+            "endpoints": {
+                family: metrics.as_dict()
+                for family, metrics in sorted(self.endpoints.items())
+            },
+            "parse_times": {
+                name: {
+                    "calls": int(calls),
+                    "mean_ms": round(total / calls * 1000, 3),
+                    "max_ms": round(maximum * 1000, 3),
+                }
+                for name, (calls, total, maximum) in sorted(self.parse_times.items())
+            },
+        }
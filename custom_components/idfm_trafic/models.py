@@ -0,0 +1,111 @@
+"""Modèles de données pour l'intégration IDFM Trafic."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, NamedTuple
+
+from .const import (
+    DEFAULT_DEPARTURES_COUNT,
+    DIRECTION_FILTER_OVERFETCH,
+    FILTER_COUNT,
+    FILTER_DIRECTIONS,
+    FILTER_DURATION,
+    FILTER_LINES,
+    FILTER_PHYSICAL_MODES,
+    FILTER_REALTIME,
+    FILTER_STOP_POINT,
+)
+
+
+class Departure(NamedTuple):
+    """Prochain départ d'une station (enregistrement compact et immuable)."""
+
+    line: str
+    line_code: str
+    direction: str
+    departure_time: str
+    departure_timestamp: float
+    time_remaining: str
+    platform: str
+    headsign: str
+    network: str
+
+
+class Disruption(NamedTuple):
+    """Perturbation réduite aux champs utilisés par le parser."""
+
+    id: str
+    status: str
+    updated_at: str
+    effect: str
+    tags: tuple[str, ...]
+    category: str
+    cause: str
+    messages: tuple[tuple[str, str], ...]  # (canal, texte)
+
+
+class DepartureQuery(NamedTuple):
+    """
+    Départs à demander pour une station.
+
+    Tout ce que l'API sait filtrer (lignes, modes, horizon, nombre, temps
+    réel, point d'arrêt) est transmis dans la requête ; seules les
+    directions, que l'API ne filtre pas par nom, le sont localement.
+    """
+
+    count: int = DEFAULT_DEPARTURES_COUNT
+    lines: tuple[str, ...] = ()
+    physical_modes: tuple[str, ...] = ()
+    directions: tuple[str, ...] = ()
+    duration: int | None = None  # secondes
+    realtime: bool = True
+    stop_point: str | None = None
+    # Groupes (ligne, direction) d'une station séparée : `count` départs chacun
+    groups: int = 1
+
+    @classmethod
+    def from_options(
+        cls, options: Mapping[str, Any] | None, count: int = DEFAULT_DEPARTURES_COUNT
+    ) -> DepartureQuery:
+        """Requête d'après les filtres d'une station (entry.data)."""
+        if not options:
+            return cls(count=count)
+        duration = options.get(FILTER_DURATION) or 0
+        return cls(
+            count=options.get(FILTER_COUNT) or count,
+            # Seuls les IDs de lignes sont valides dans la requête (les
+            # anciens filtres enregistrés par code sont ignorés)
+            lines=tuple(
+                line_id
+                for line_id in options.get(FILTER_LINES, ())
+                if line_id.startswith("line:")
+            ),
+            physical_modes=tuple(options.get(FILTER_PHYSICAL_MODES, ())),
+            directions=tuple(
+                direction.casefold() for direction in options.get(FILTER_DIRECTIONS, ())
+            ),
+            duration=duration * 60 if duration else None,
+            realtime=options.get(FILTER_REALTIME, True),
+            stop_point=options.get(FILTER_STOP_POINT) or None,
+        )
+
+    @property
+    def request_count(self) -> int:
+        """Nombre de départs à demander à l'API."""
+        if self.directions:
+            return self.count * self.groups * DIRECTION_FILTER_OVERFETCH
+        return self.count * self.groups
+
+    def select(self, departures: list[Departure]) -> list[Departure]:
+        """Appliquer le filtre des directions et le nombre de départs (de tous les groupes)."""
+        if self.directions:
+            departures = [
+                departure
+                for departure in departures
+                if any(
+                    direction in departure.direction.casefold()
+                    or direction in departure.headsign.casefold()
+                    for direction in self.directions
+                )
+            ]
+        return departures[: self.count * self.groups]
@@ -0,0 +1,174 @@
+"""Limitation du débit des requêtes vers l'API PRIM."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime
+import heapq
+import itertools
+import time
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+from .const import MAX_DEFERRAL_WAIT, NAVITIA_TIMEZONE
+
+# Le quota PRIM est remis à zéro chaque jour à minuit, heure de Paris
+_QUOTA_TIMEZONE = ZoneInfo(NAVITIA_TIMEZONE)
+
+
+def _quota_day() -> date:
+    """Jour courant du quota (heure de Paris, quel que soit le fuseau de l'instance)."""
+    return datetime.now(_QUOTA_TIMEZONE).date()
+
+
+class PRIMRateLimiter:
+    """
+    Limiteur à seau de jetons avec file de priorité et quota journalier.
+
+    - Le seau se remplit à `requests_per_second` jetons par seconde.
+    - Quand le seau est vide, les demandes attendent dans une file triée par
+      priorité (valeur la plus basse servie en premier).
+    - Un `Retry-After` renvoyé par l'API suspend toutes les demandes jusqu'à
+      son expiration.
+    - Le quota journalier est décompté localement et remis à zéro chaque jour
+      (à minuit, heure de Paris).
+    """
+
+    def __init__(self, requests_per_second: float, daily_quota: int) -> None:
+        """Initialisation du limiteur."""
+        self.requests_per_second = requests_per_second
+        self.daily_quota = daily_quota
+        self._capacity = max(1.0, requests_per_second)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._day = _quota_day()
+        self._used_today = 0
+        # Appelé à chaque requête décomptée (persistance du quota)
+        self.on_usage: Callable[[], None] | None = None
+
+    @property
+    def used_today(self) -> int:
+        """Nombre de requêtes envoyées aujourd'hui."""
+        self._roll_day()
+        return self._used_today
+
+    @property
+    def usage(self) -> dict[str, str | int]:
+        """Décompte du jour, sous une forme sérialisable."""
+        return {"day": self._day.isoformat(), "used": self.used_today}
+
+    def restore(self, usage: dict[str, str | int]) -> None:
+        """Reprendre un décompte enregistré, s'il porte sur le jour courant."""
+        try:
+            day = date.fromisoformat(str(usage["day"]))
+            used = int(usage["used"])
+        except (KeyError, TypeError, ValueError):
+            return
+        self._roll_day()
+        if day == self._day:
+            self._used_today = max(self._used_today, used)
+
+    @property
+    def remaining_daily(self) -> int:
+        """Nombre de requêtes restantes sur le quota du jour."""
+        return max(0, self.daily_quota - self.used_today)
+
+    @property
+    def deferred_for(self) -> float:
+        """Durée (secondes) restante de la suspension demandée par l'API."""
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    async def acquire(self, priority: int) -> bool:
+        """
+        Attendre l'autorisation d'envoyer une requête.
+
+        Returns:
+            False si le quota journalier est épuisé ou si l'API a demandé une
+            suspension plus longue que MAX_DEFERRAL_WAIT : la requête ne doit
+            alors pas être envoyée.
+        """
+        if self.remaining_daily <= 0 or self.deferred_for > MAX_DEFERRAL_WAIT:
+            return False
+
+        if not self._waiters and self._try_consume():
+            self._count()
+            return True
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._schedule()
+        # Une demande annulée reste dans la file et sera ignorée par _dispatch
+        await future
+
+        if self.remaining_daily <= 0:
+            return False
+        self._count()
+        return True
+
+    def defer(self, seconds: float) -> None:
+        """Suspendre les requêtes pendant `seconds` secondes (Retry-After)."""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        self._schedule()
+
+    def _count(self) -> None:
+        """Décompter une requête sur le quota du jour."""
+        self._used_today += 1
+        if self.on_usage is not None:
+            self.on_usage()
+
+    def _roll_day(self) -> None:
+        """Remettre le compteur journalier à zéro au changement de jour."""
+        today = _quota_day()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+
+    def _refill(self) -> float:
+        """Remplir le seau selon le temps écoulé et retourner l'instant courant."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated) * self.requests_per_second,
+        )
+        self._updated = now
+        return now
+
+    def _try_consume(self) -> bool:
+        """Consommer un jeton si possible."""
+        now = self._refill()
+        if now < self._blocked_until or self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _dispatch(self) -> None:
+        """Réveiller les demandes en attente, par ordre de priorité."""
+        self._wakeup = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._try_consume():
+                break
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Planifier le prochain réveil de la file si nécessaire."""
+        if self._wakeup is not None or not self._waiters:
+            return
+        now = self._refill()
+        delay = max(
+            self._blocked_until - now,
+            (1 - self._tokens) / self.requests_per_second,
+            0.0,
+        )
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
@@ -0,0 +1,93 @@
+"""Chargement des référentiels IDFM (stations, lignes) persistés sur disque."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+import time
+from typing import Any, Protocol, TypeVar
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Referential(Protocol):
+    """Référentiel construit depuis une liste téléchargée."""
+
+    fetched_at: float
+
+
+_ReferentialT = TypeVar("_ReferentialT", bound=Referential)
+
+
+async def async_get_referential(
+    hass: HomeAssistant,
+    name: str,
+    ttl: float,
+    build: Callable[[dict[str, Any], float], _ReferentialT],
+    download: Callable[[], Awaitable[dict[str, Any]]],
+    allow_download: bool = True,
+) -> _ReferentialT | None:
+    """
+    Obtenir un référentiel partagé par toutes les entrées.
+
+    Le référentiel n'est construit qu'à la première demande : chargé depuis
+    le disque, puis téléchargé si absent ou plus vieux que `ttl` (sauf si
+    `allow_download` est False). Les appels simultanés partagent le même
+    chargement, et un référentiel expiré reste utilisé si le
+    téléchargement échoue.
+
+    Args:
+        name: Nom du référentiel (clé dans hass.data[DOMAIN] et sur disque)
+        ttl: Durée de validité (secondes) de la liste téléchargée
+        build: Construit le référentiel depuis les éléments et leur date
+            (exécuté hors de la boucle d'événements : les index des grands
+            référentiels prennent plusieurs centaines de millisecondes)
+        download: Télécharge les éléments (JSON sérialisable, vide si erreur)
+        allow_download: Autoriser le téléchargement
+    """
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    shared = domain_data.get(name)
+
+    def _expired(referential: Referential) -> bool:
+        return time.time() - referential.fetched_at > ttl
+
+    if shared is not None and not isinstance(shared, asyncio.Task):
+        if not (allow_download and _expired(shared)):
+            return shared
+    if isinstance(shared, asyncio.Task):
+        return await asyncio.shield(shared)
+
+    store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{name}")
+
+    async def _load() -> _ReferentialT | None:
+        referential = shared
+        if referential is None:
+            stored = await store.async_load()
+            if stored:
+                referential = await hass.async_add_executor_job(
+                    build, stored["items"], stored["fetched_at"]
+                )
+        if allow_download and (referential is None or _expired(referential)):
+            items = await download()
+            if items:
+                fetched_at = time.time()
+                await store.async_save({"fetched_at": fetched_at, "items": items})
+                _LOGGER.debug("Référentiel IDFM %s téléchargé: %d éléments", name, len(items))
+                referential = await hass.async_add_executor_job(build, items, fetched_at)
+        return referential
+
+    task = hass.async_create_task(_load())
+    domain_data[name] = task
+    try:
+        referential = await asyncio.shield(task)
+    finally:
+        if domain_data.get(name) is task:
+            domain_data.pop(name)
+    if referential is not None:
+        domain_data[name] = referential
+    return referential
@@ -1,21 +1,31 @@
 """Sensors pour l'intégration IDFM Trafic."""
 from __future__ import annotations
 
+from collections.abc import Hashable
 from datetime import datetime
 import logging
 from typing import Any
 
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
+from homeassistant.util import slugify
+
+from .const import (
+    CONF_STATION_FILTERS,
+    CONF_STATION_INFO,
+    DOMAIN,
+    FILTER_SPLIT,
+    NORMAL_COLOR,
+    SEVERITY_COLORS,
 )
-
-from .const import DOMAIN, LINES
-from .idfm_api import IDFMApiClient, IDFMTrafficParser
+from .coordinator import IDFMDataUpdateCoordinator
+from .entity import IDFMEntity
+from .lines import LineInfo, async_get_line_catalog
+from .models import Departure, DepartureQuery
+from .stop_areas import async_get_stop_area_index
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,7 +37,6 @@ async def async_setup_entry(
 ) -> None:
     """Configuration des sensors depuis une config entry."""
     coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-    client = hass.data[DOMAIN][entry.entry_id]["client"]
     
     entities = []
     
@@ -38,49 +47,187 @@ async def async_setup_entry(
     traffic_enabled = entry.data.get("traffic_enabled", True)
     departures_enabled = entry.data.get("departures_enabled", True)
     
-    # Créer les sensors de trafic par ligne
+    # Créer les sensors de trafic par ligne (noms issus du catalogue local)
     if traffic_enabled:
+        catalog = await async_get_line_catalog(
+            hass, coordinator.client, allow_download=False
+        )
         for line_id in lines:
             entities.append(
-                IDFMLineTrafficSensor(coordinator, client, line_id, entry.entry_id)
+                IDFMLineTrafficSensor(
+                    coordinator, line_id, entry.entry_id, catalog.get(line_id)
+                )
             )
     
-    # Créer les sensors de départs par station
+    # Créer les sensors de départs par station (noms vérifiés à la
+    # configuration, sinon issus de l'index local)
+    station_info = entry.data.get(CONF_STATION_INFO, {})
+    station_filters = entry.data.get(CONF_STATION_FILTERS, {})
+    index = None
+    if any(station_id not in station_info for station_id in stations):
+        index = await async_get_stop_area_index(
+            hass, coordinator.client, allow_download=False
+        )
+    departures_sensors = []
     if departures_enabled:
         for station_id in stations:
-            entities.append(
-                IDFMStationDeparturesSensor(coordinator, client, station_id, entry.entry_id)
+            info = station_info.get(station_id, {})
+            departures_sensors.append(
+                IDFMStationDeparturesSensor(
+                    coordinator,
+                    station_id,
+                    entry.entry_id,
+                    info.get("name") or (index.name(station_id) if index else None),
+                    info.get("lines", []),
+                    DepartureQuery.from_options(
+                        station_filters.get(station_id), coordinator.max_attribute_items
+                    ).count,
+                )
             )
+        entities.extend(departures_sensors)
+    
+    # Infos trafic par station, tirées des perturbations du réseau
+    station_traffic_sensors = []
+    if traffic_enabled:
+        for station_id in stations:
+            info = station_info.get(station_id, {})
+            station_traffic_sensors.append(
+                IDFMStationTrafficSensor(
+                    coordinator,
+                    station_id,
+                    entry.entry_id,
+                    info.get("name") or (index.name(station_id) if index else None),
+                )
+            )
+        entities.extend(station_traffic_sensors)
+    
+    # Sensor de diagnostic du quota PRIM
+    entities.append(IDFMApiQuotaSensor(coordinator, entry.entry_id))
+    entities.append(IDFMInitialRefreshSensor(coordinator, entry.entry_id))
+    # Mesures du client (désactivées par défaut)
+    entities.append(IDFMApiLatencySensor(coordinator, entry.entry_id))
+    entities.append(IDFMApiTransferSensor(coordinator, entry.entry_id))
     
     async_add_entities(entities)
-
-
-class IDFMLineTrafficSensor(CoordinatorEntity, SensorEntity):
+    
+    # Sensors par ligne et direction, ajoutés au fil des groupes découverts
+    split_sensors = [
+        sensor
+        for sensor in departures_sensors
+        if station_filters.get(sensor.station_id, {}).get(FILTER_SPLIT)
+    ]
+    if split_sensors:
+        add_group_sensors = _group_sensors_adder(coordinator, split_sensors, async_add_entities)
+        add_group_sensors()
+        entry.async_on_unload(coordinator.async_add_listener(add_group_sensors))
+    
+    # Noms inconnus de l'index local : le télécharger en arrière-plan
+    unresolved = [
+        sensor
+        for sensor in [*departures_sensors, *station_traffic_sensors]
+        if not sensor.name_resolved
+    ]
+    if unresolved:
+        entry.async_create_background_task(
+            hass,
+            _async_resolve_station_names(hass, coordinator, unresolved),
+            f"{DOMAIN}_station_names_{entry.entry_id}",
+        )
+
+
+def _group_sensors_adder(
+    coordinator: IDFMDataUpdateCoordinator,
+    parents: list[IDFMStationDeparturesSensor],
+    async_add_entities: AddEntitiesCallback,
+) -> CALLBACK_TYPE:
+    """Callback qui crée un sensor pour chaque nouveau groupe (ligne, direction)."""
+    known: set[tuple[str, str, str]] = set()
+
+    @callback
+    def _async_add_group_sensors() -> None:
+        new_sensors = []
+        for parent in parents:
+            groups = coordinator.departure_groups(parent.station_id)
+            for (line_code, direction), departures in groups.items():
+                key = (parent.station_id, line_code, direction)
+                if key in known or not departures:
+                    continue
+                known.add(key)
+                new_sensors.append(
+                    IDFMDepartureGroupSensor(
+                        coordinator, parent, line_code, departures[0].line, direction
+                    )
+                )
+        if new_sensors:
+            async_add_entities(new_sensors)
+
+    return _async_add_group_sensors
+
+
+async def _async_resolve_station_names(
+    hass: HomeAssistant,
+    coordinator: IDFMDataUpdateCoordinator,
+    sensors: list[IDFMStationDeparturesSensor | IDFMStationTrafficSensor],
+) -> None:
+    """Résoudre le nom des stations depuis l'index local (téléchargé si besoin)."""
+    index = await async_get_stop_area_index(hass, coordinator.client)
+    if index is None:
+        return
+    for sensor in sensors:
+        name = index.name(sensor.station_id)
+        if name:
+            sensor.async_set_station_name(name)
+
+
+def _traffic_fingerprint(traffic: dict[str, Any] | None) -> Hashable:
+    """Empreinte d'infos trafic : statut et messages (hors heure de parsing)."""
+    if not traffic:
+        return None
+    return (
+        traffic["status"],
+        traffic["severity"],
+        tuple(
+            (message["title"], message["message"], message["updated_at"])
+            for message in traffic["messages"]
+        ),
+    )
+
+
+class IDFMLineTrafficSensor(IDFMEntity, SensorEntity):
     """Sensor pour les infos trafic d'une ligne."""
 
+    _unrecorded_attributes = frozenset({"messages"})
+
     def __init__(
         self,
-        coordinator: DataUpdateCoordinator,
-        client: IDFMApiClient,
+        coordinator: IDFMDataUpdateCoordinator,
         line_id: str,
         entry_id: str,
+        line_info: LineInfo | None = None,
     ) -> None:
         """Initialisation du sensor."""
         super().__init__(coordinator)
-        self._client = client
         self._line_id = line_id
         self._entry_id = entry_id
         self._attr_has_entity_name = True
         
-        # Récupérer les infos de la ligne
-        line_info = LINES.get(line_id, {})
-        self._line_name = line_info.get("name", line_id)
-        self._line_color = line_info.get("color", "#000000")
+        # Infos de la ligne issues du catalogue
+        self._line_name = line_info.name if line_info else line_id
+        self._line_color = line_info.color if line_info else "#000000"
         
         self._attr_name = f"{self._line_name} Trafic"
         self._attr_unique_id = f"{entry_id}_{line_id}_traffic"
-        
-        self._traffic_data = None
+
+    @property
+    def _traffic_data(self) -> dict[str, Any] | None:
+        """Infos trafic de la ligne issues du dernier rafraîchissement."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data["lines"].get(self._line_id)
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte du statut et des messages (hors heure de parsing)."""
+        return _traffic_fingerprint(self._traffic_data)
 
     @property
     def native_value(self) -> str:
@@ -106,89 +253,89 @@ class IDFMLineTrafficSensor(CoordinatorEntity, SensorEntity):
     def icon_color(self) -> str:
         """Couleur de l'icône selon la sévérité."""
         if self._traffic_data:
-            severity = self._traffic_data.get("severity", "information")
-            if severity == "blocking":
-                return "#FF0000"  # Rouge
-            elif severity == "perturbation":
-                return "#FF8C00"  # Orange
-            elif severity == "information":
-                return "#FFA500"  # Orange clair
-        return "#00FF00"  # Vert (normal)
+            return SEVERITY_COLORS.get(self._traffic_data["severity"], NORMAL_COLOR)
+        return NORMAL_COLOR
 
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def _build_attributes(self) -> dict[str, Any]:
         """Attributs supplémentaires."""
         if not self._traffic_data:
             return {}
         
-        severity = self._traffic_data.get("severity", "information")
-        
-        # Déterminer la couleur selon la sévérité
-        if severity == "blocking":
-            status_color = "#FF0000"  # Rouge
-        elif severity == "perturbation":
-            status_color = "#FF8C00"  # Orange
-        elif severity == "information":
-            status_color = "#FFA500"  # Orange clair
-        else:
-            status_color = "#00FF00"  # Vert (normal)
+        messages = self._traffic_data.get("messages", [])
         
         return {
             "line_id": self._line_id,
             "line_name": self._line_name,
             "line_color": self._line_color,
-            "severity": severity,
-            "status_color": status_color,
-            "messages": self._traffic_data.get("messages", []),
+            "severity": self._traffic_data.get("severity", "information"),
+            "status_color": self.icon_color,
+            "messages": messages[: self.coordinator.max_attribute_items],
             "updated_at": self._traffic_data.get("updated_at"),
-            "message_count": len(self._traffic_data.get("messages", [])),
+            "message_count": len(messages),
         }
 
-    async def async_added_to_hass(self) -> None:
-        """Quand l'entité est ajoutée à Home Assistant."""
-        await super().async_added_to_hass()
-        # Forcer une première mise à jour
-        await self._async_update_data()
 
-    async def async_update(self) -> None:
-        """Mise à jour via le coordinateur."""
-        await self._async_update_data()
-
-    async def _async_update_data(self) -> None:
-        """Récupérer les données de l'API."""
-        try:
-            data = await self._client.async_get_line_traffic(self._line_id)
-            if data:
-                self._traffic_data = IDFMTrafficParser.parse_line_reports(data)
-                _LOGGER.debug("Traffic data updated for %s: %s", self._line_name, self._traffic_data.get("status"))
-        except Exception as e:
-            _LOGGER.error("Error updating traffic for %s: %s", self._line_name, e)
-
-
-class IDFMStationDeparturesSensor(CoordinatorEntity, SensorEntity):
+class IDFMStationDeparturesSensor(IDFMEntity, SensorEntity):
     """Sensor pour les prochains départs d'une station."""
 
+    _unrecorded_attributes = frozenset({"departures"})
+
     def __init__(
         self,
-        coordinator: DataUpdateCoordinator,
-        client: IDFMApiClient,
+        coordinator: IDFMDataUpdateCoordinator,
         station_id: str,
         entry_id: str,
+        station_name: str | None = None,
+        station_lines: list[str] | None = None,
+        departures_count: int | None = None,
     ) -> None:
         """Initialisation du sensor."""
         super().__init__(coordinator)
-        self._client = client
         self._station_id = station_id
         self._entry_id = entry_id
+        self._station_lines = station_lines or []
+        # Une station séparée reçoit les départs de tous ses groupes
+        self._departures_count = departures_count or coordinator.max_attribute_items
         self._attr_has_entity_name = True
         
-        # Le nom de la station sera récupéré depuis l'API
-        self._station_name = station_id.split(":")[-1]  # Fallback
+        # Nom issu de l'index local des stations, sinon l'ID en attendant
+        self.name_resolved = station_name is not None
+        self._station_name = station_name or station_id.split(":")[-1]
         
         self._attr_name = f"{self._station_name} Départs"
         self._attr_unique_id = f"{entry_id}_{station_id}_departures"
-        
-        self._departures = []
+
+    @property
+    def station_id(self) -> str:
+        """ID de la station."""
+        return self._station_id
+
+    @property
+    def station_name(self) -> str:
+        """Nom de la station."""
+        return self._station_name
+
+    @callback
+    def async_set_station_name(self, station_name: str) -> None:
+        """Mettre à jour le nom de la station une fois résolu."""
+        self.name_resolved = True
+        self._station_name = station_name
+        self._attr_name = f"{station_name} Départs"
+        self._attributes = None
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    @property
+    def _departures(self) -> list[Departure]:
+        """Prochains départs de la station issus du dernier rafraîchissement."""
+        if not self.coordinator.data:
+            return []
+        departures = self.coordinator.data["stations"].get(self._station_id, [])
+        return departures[: self._departures_count]
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte des départs affichés."""
+        return tuple(self._departures)
 
     @property
     def native_value(self) -> int:
@@ -200,79 +347,144 @@ class IDFMStationDeparturesSensor(CoordinatorEntity, SensorEntity):
         """Icône du sensor."""
         return "mdi:clock-outline"
 
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def _build_attributes(self) -> dict[str, Any]:
         """Attributs supplémentaires."""
-        attributes = {
+        departures = self._departures
+        attributes: dict[str, Any] = {
             "station_id": self._station_id,
             "station_name": self._station_name,
-            "departures": self._departures,
+            "lines": self._station_lines,
+            "departures": [
+                departure._asdict()
+                for departure in departures[: self.coordinator.max_attribute_items]
+            ],
         }
         
-        # Ajouter les 5 prochains départs comme attributs individuels
-        for i, departure in enumerate(self._departures[:5], 1):
-            attributes[f"departure_{i}"] = {
-                "line": departure.get("line"),
-                "direction": departure.get("direction"),
-                "time": departure.get("time_remaining"),
-                "platform": departure.get("platform"),
-            }
-        
         # Prochain départ
-        if self._departures:
-            next_dep = self._departures[0]
+        if departures:
+            next_dep = departures[0]
             attributes["next_departure"] = {
-                "line": next_dep.get("line"),
-                "direction": next_dep.get("direction"),
-                "time": next_dep.get("time_remaining"),
+                "line": next_dep.line,
+                "direction": next_dep.direction,
+                "time": next_dep.time_remaining,
             }
         
         return attributes
 
-    async def async_added_to_hass(self) -> None:
-        """Quand l'entité est ajoutée à Home Assistant."""
-        await super().async_added_to_hass()
-        # Forcer une première mise à jour
-        await self._async_update_data()
 
-    async def async_update(self) -> None:
-        """Mise à jour via le coordinateur."""
-        await self._async_update_data()
+class IDFMDepartureGroupSensor(IDFMEntity, SensorEntity):
+    """
+    Sensor des prochains départs d'une ligne dans une direction.
+
+    Issu des départs de la station déjà récupérés : aucune requête en plus.
+    """
+
+    _unrecorded_attributes = frozenset({"departures"})
+    _attr_icon = "mdi:clock-outline"
+
+    def __init__(
+        self,
+        coordinator: IDFMDataUpdateCoordinator,
+        parent: IDFMStationDeparturesSensor,
+        line_code: str,
+        line: str,
+        direction: str,
+    ) -> None:
+        """Initialisation du sensor."""
+        super().__init__(coordinator)
+        self._station_id = parent.station_id
+        self._station_name = parent.station_name
+        self._group = (line_code, direction)
+        self._line = line
+        self._attr_has_entity_name = True
+        self._attr_name = f"{self._station_name} {line} → {direction}"
+        self._attr_unique_id = (
+            f"{parent.unique_id}_{slugify(line_code)}_{slugify(direction)}"
+        )
+
+    @property
+    def _departures(self) -> list[Departure]:
+        """Prochains départs du groupe."""
+        return self.coordinator.departure_groups(self._station_id).get(self._group, [])
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte des départs affichés."""
+        return tuple(self._departures)
+
+    @property
+    def native_value(self) -> str | None:
+        """Valeur du sensor (temps restant avant le prochain départ)."""
+        departures = self._departures
+        return departures[0].time_remaining if departures else None
+
+    def _build_attributes(self) -> dict[str, Any]:
+        """Attributs supplémentaires."""
+        line_code, direction = self._group
+        return {
+            "station_id": self._station_id,
+            "station_name": self._station_name,
+            "line": self._line,
+            "line_code": line_code,
+            "direction": direction,
+            "departures": [departure._asdict() for departure in self._departures],
+        }
+
 
-    async def _async_update_data(self) -> None:
-        """Récupérer les données de l'API."""
-        try:
-            data = await self._client.async_get_station_departures(self._station_id, count=10)
-            if data:
-                self._departures = IDFMTrafficParser.parse_departures(data)
-                _LOGGER.debug("Departures updated for %s: %d trains", self._station_name, len(self._departures))
-        except Exception as e:
-            _LOGGER.error("Error updating departures for %s: %s", self._station_name, e)
+class IDFMStationTrafficSensor(IDFMEntity, SensorEntity):
+    """
+    Sensor pour les infos trafic affectant une station.
 
+    Issu de l'index des perturbations du réseau déjà récupérées pour les
+    lignes : aucune requête par station.
+    """
 
-class IDFMStationTrafficSensor(CoordinatorEntity, SensorEntity):
-    """Sensor pour les infos trafic affectant une station."""
+    _unrecorded_attributes = frozenset({"messages"})
 
     def __init__(
         self,
-        coordinator: DataUpdateCoordinator,
-        client: IDFMApiClient,
+        coordinator: IDFMDataUpdateCoordinator,
         station_id: str,
         entry_id: str,
+        station_name: str | None = None,
     ) -> None:
         """Initialisation du sensor."""
         super().__init__(coordinator)
-        self._client = client
         self._station_id = station_id
         self._entry_id = entry_id
         self._attr_has_entity_name = True
         
-        self._station_name = station_id.split(":")[-1]
+        # Nom issu de l'index local des stations, sinon l'ID en attendant
+        self.name_resolved = station_name is not None
+        self._station_name = station_name or station_id.split(":")[-1]
         
         self._attr_name = f"{self._station_name} Trafic"
         self._attr_unique_id = f"{entry_id}_{station_id}_traffic"
-        
-        self._traffic_data = None
+
+    @property
+    def station_id(self) -> str:
+        """ID de la station."""
+        return self._station_id
+
+    @callback
+    def async_set_station_name(self, station_name: str) -> None:
+        """Mettre à jour le nom de la station une fois résolu."""
+        self.name_resolved = True
+        self._station_name = station_name
+        self._attr_name = f"{station_name} Trafic"
+        self._attributes = None
+        if self.hass is not None:
+            self.async_write_ha_state()
+
+    @property
+    def _traffic_data(self) -> dict[str, Any] | None:
+        """Infos trafic de la station issues du dernier rafraîchissement."""
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data.get("station_traffic", {}).get(self._station_id)
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte du statut et des messages (hors heure de parsing)."""
+        return _traffic_fingerprint(self._traffic_data)
 
     @property
     def native_value(self) -> str:
@@ -290,24 +502,190 @@ class IDFMStationTrafficSensor(CoordinatorEntity, SensorEntity):
                 return "mdi:check-circle"
             elif status == "perturbation":
                 return "mdi:alert-circle"
+            elif status == "information":
+                return "mdi:information"
         return "mdi:train-variant"
 
-    @property
-    def extra_state_attributes(self) -> dict[str, Any]:
+    def _build_attributes(self) -> dict[str, Any]:
         """Attributs supplémentaires."""
         if not self._traffic_data:
             return {}
-        
+
+        messages = self._traffic_data.get("messages", [])
+
         return {
             "station_id": self._station_id,
             "station_name": self._station_name,
             "severity": self._traffic_data.get("severity", "information"),
-            "messages": self._traffic_data.get("messages", []),
+            "messages": messages[: self.coordinator.max_attribute_items],
             "updated_at": self._traffic_data.get("updated_at"),
+            "message_count": len(messages),
+        }
+
+
+class IDFMApiQuotaSensor(IDFMEntity, SensorEntity):
+    """Sensor de diagnostic du quota journalier restant sur l'API PRIM."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_icon = "mdi:counter"
+    _attr_native_unit_of_measurement = "requêtes"
+
+    def __init__(
+        self,
+        coordinator: IDFMDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialisation du sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+        self._attr_has_entity_name = True
+        self._attr_name = "Quota API restant"
+        self._attr_unique_id = f"{entry_id}_api_quota"
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte du quota restant et de la suspension en cours."""
+        rate_limiter = self.coordinator.client.rate_limiter
+        return rate_limiter.remaining_daily, round(rate_limiter.deferred_for)
+
+    @property
+    def native_value(self) -> int:
+        """Valeur du sensor (requêtes restantes aujourd'hui)."""
+        return self.coordinator.client.rate_limiter.remaining_daily
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Attributs supplémentaires."""
+        rate_limiter = self.coordinator.client.rate_limiter
+        return {
+            "daily_quota": rate_limiter.daily_quota,
+            "used_today": rate_limiter.used_today,
+            "requests_per_second": rate_limiter.requests_per_second,
+            "deferred_for": round(rate_limiter.deferred_for),
         }
 
-    async def async_update(self) -> None:
-        """Mise à jour des données."""
-        data = await self._client.async_get_station_traffic(self._station_id)
-        if data:
-            self._traffic_data = IDFMTrafficParser.parse_line_reports(data)
+
+class IDFMInitialRefreshSensor(IDFMEntity, SensorEntity):
+    """Sensor de diagnostic de la durée du premier chargement depuis l'API."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 2
+
+    def __init__(
+        self,
+        coordinator: IDFMDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialisation du sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+        self._attr_has_entity_name = True
+        self._attr_name = "Durée du premier chargement"
+        self._attr_unique_id = f"{entry_id}_initial_refresh_duration"
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte de la durée mesurée."""
+        return self.coordinator.initial_refresh_duration
+
+    @property
+    def native_value(self) -> float | None:
+        """Valeur du sensor (secondes)."""
+        return self.coordinator.initial_refresh_duration
+
+
+class IDFMApiLatencySensor(IDFMEntity, SensorEntity):
+    """Sensor de diagnostic de la latence récente de l'API PRIM."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 0
+
+    def __init__(
+        self,
+        coordinator: IDFMDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialisation du sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+        self._attr_has_entity_name = True
+        self._attr_name = "Latence API"
+        self._attr_unique_id = f"{entry_id}_api_latency"
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte de la latence (à la milliseconde) et du nombre de requêtes."""
+        metrics = self.coordinator.client.metrics
+        return self.native_value, metrics.total("requests")
+
+    @property
+    def native_value(self) -> float | None:
+        """Valeur du sensor (millisecondes)."""
+        latency = self.coordinator.client.metrics.recent_latency
+        return round(latency * 1000) if latency is not None else None
+
+    def _build_attributes(self) -> dict[str, Any]:
+        """Latence récente, requêtes et erreurs par famille de requêtes."""
+        attributes: dict[str, Any] = {}
+        for family, metrics in sorted(self.coordinator.client.metrics.endpoints.items()):
+            attributes[family] = {
+                "latency_ms": round(metrics.latency_ewma * 1000)
+                if metrics.latency_ewma is not None
+                else None,
+                "requests": metrics.requests,
+                "errors": sum(metrics.errors.values()),
+            }
+        return attributes
+
+
+class IDFMApiTransferSensor(IDFMEntity, SensorEntity):
+    """Sensor de diagnostic du volume reçu de l'API PRIM."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_native_unit_of_measurement = UnitOfInformation.KILOBYTES
+    _attr_suggested_display_precision = 0
+
+    def __init__(
+        self,
+        coordinator: IDFMDataUpdateCoordinator,
+        entry_id: str,
+    ) -> None:
+        """Initialisation du sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+        self._attr_has_entity_name = True
+        self._attr_name = "Volume reçu de l'API"
+        self._attr_unique_id = f"{entry_id}_api_transfer"
+
+    def _fingerprint(self) -> Hashable:
+        """Empreinte du volume (au kilo-octet près) et des réponses du cache."""
+        metrics = self.coordinator.client.metrics
+        return (
+            self.native_value,
+            metrics.total("cache_hits"),
+            metrics.total("not_modified"),
+        )
+
+    @property
+    def native_value(self) -> int:
+        """Valeur du sensor (ko reçus depuis le démarrage)."""
+        return round(self.coordinator.client.metrics.total("bytes_on_wire") / 1000)
+
+    def _build_attributes(self) -> dict[str, Any]:
+        """Économies dues à la compression et au cache."""
+        metrics = self.coordinator.client.metrics
+        on_wire = metrics.total("bytes_on_wire")
+        without_savings = metrics.total("bytes_without_savings")
+        return {
+            "kilobytes_without_savings": round(without_savings / 1000),
+            "savings_ratio": round(1 - on_wire / without_savings, 3)
+            if without_savings
+            else None,
+            "cache_hits": metrics.total("cache_hits"),
+            "stale_served": metrics.total("stale_served"),
+            "not_modified": metrics.total("not_modified"),
+        }
@@ -0,0 +1,207 @@
+"""Index local des stations (stop areas) IDFM pour la recherche et les noms."""
+from __future__ import annotations
+
+import asyncio
+import bisect
+from collections import Counter
+import re
+from typing import Any, NamedTuple
+import unicodedata
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_KNOWN_STOP_AREAS, DATA_STOP_AREA_INDEX, DOMAIN, STOP_AREA_INDEX_TTL
+from .idfm_api import IDFMApiClient
+from .referential import async_get_referential
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(text: str) -> str:
+    """Normaliser un nom pour la recherche (minuscules, sans accents ni ponctuation)."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    """Trigrammes d'un texte normalisé (avec bordures)."""
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class StopAreaIndex:
+    """
+    Index en mémoire des stations, construit une fois depuis la liste complète.
+
+    - Recherche par préfixe de mots, insensible aux accents et à la casse
+      (ex: "chat hal" trouve "Châtelet - Les Halles").
+    - Repli sur une recherche approchée par trigrammes si aucun préfixe ne
+      correspond (fautes de frappe).
+    """
+
+    def __init__(self, stop_areas: dict[str, tuple[str, str]], fetched_at: float) -> None:
+        """
+        Initialisation de l'index.
+
+        Args:
+            stop_areas: {stop_area_id: (nom, libellé avec commune)}
+            fetched_at: Horodatage du téléchargement de la liste
+        """
+        self.stop_areas = stop_areas
+        self.fetched_at = fetched_at
+        # (mot normalisé, id) triés, pour la recherche par préfixe
+        self._words: list[tuple[str, str]] = []
+        self._trigrams: dict[str, set[str]] = {}
+
+        for stop_area_id, (_, label) in stop_areas.items():
+            normalized = normalize_name(label)
+            for word in set(normalized.split()):
+                self._words.append((word, stop_area_id))
+            for trigram in _trigrams(normalized):
+                self._trigrams.setdefault(trigram, set()).add(stop_area_id)
+        self._words.sort()
+
+    def name(self, stop_area_id: str) -> str | None:
+        """Nom d'affichage d'une station."""
+        stop_area = self.stop_areas.get(stop_area_id)
+        return stop_area[0] if stop_area else None
+
+    def label(self, stop_area_id: str) -> str | None:
+        """Libellé d'une station (nom et commune)."""
+        stop_area = self.stop_areas.get(stop_area_id)
+        return stop_area[1] if stop_area else None
+
+    def _prefix_matches(self, prefix: str) -> set[str]:
+        """Stations dont un mot commence par `prefix`."""
+        matches = set()
+        words = self._words
+        for position in range(bisect.bisect_left(words, (prefix, "")), len(words)):
+            word, stop_area_id = words[position]
+            if not word.startswith(prefix):
+                break
+            matches.add(stop_area_id)
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[str, str]]:
+        """
+        Rechercher des stations par nom.
+
+        Returns:
+            [(stop_area_id, libellé)] triés par pertinence
+        """
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        candidates: set[str] | None = None
+        for token in normalized.split():
+            matches = self._prefix_matches(token)
+            candidates = matches if candidates is None else candidates & matches
+
+        if candidates:
+            # Les libellés les plus courts sont les correspondances les plus exactes
+            ranked = sorted(candidates, key=lambda sid: (len(self.stop_areas[sid][1]), sid))
+        else:
+            scores: Counter[str] = Counter()
+            for trigram in _trigrams(normalized):
+                scores.update(self._trigrams.get(trigram, ()))
+            ranked = [stop_area_id for stop_area_id, _ in scores.most_common(limit)]
+
+        return [(stop_area_id, self.stop_areas[stop_area_id][1]) for stop_area_id in ranked[:limit]]
+
+
+async def async_get_stop_area_index(
+    hass: HomeAssistant, client: IDFMApiClient, allow_download: bool = True
+) -> StopAreaIndex | None:
+    """
+    Obtenir l'index des stations partagé par toutes les entrées.
+
+    L'index est chargé depuis le disque, et téléchargé si absent ou expiré
+    (sauf si `allow_download` est False).
+    """
+
+    async def _download() -> dict[str, Any]:
+        stop_areas = await client.async_get_all_stop_areas()
+        return {sid: list(values) for sid, values in stop_areas.items()}
+
+    return await async_get_referential(
+        hass,
+        DATA_STOP_AREA_INDEX,
+        STOP_AREA_INDEX_TTL,
+        lambda items, fetched_at: StopAreaIndex(
+            {sid: tuple(values) for sid, values in items.items()}, fetched_at
+        ),
+        _download,
+        allow_download,
+    )
+
+
+class StopAreaInfo(NamedTuple):
+    """Station vérifiée auprès de l'API."""
+
+    name: str
+    lines: tuple[str, ...]  # codes des lignes, pour l'affichage
+    line_ids: tuple[str, ...] = ()  # IDs des lignes, pour les filtres
+
+
+async def async_resolve_stop_areas(
+    hass: HomeAssistant,
+    client: IDFMApiClient,
+    stop_area_ids: list[str],
+    verified: dict[str, StopAreaInfo] | None = None,
+) -> tuple[dict[str, StopAreaInfo], list[str], list[str]]:
+    """
+    Vérifier des IDs de stations et résoudre leur nom et leurs lignes.
+
+    Les stations déjà vérifiées sont reprises du cache ; les autres sont
+    interrogées toutes en même temps (une requête chacune).
+
+    Args:
+        stop_area_ids: IDs des stations à vérifier
+        verified: Stations déjà vérifiées (ex: celles d'une entrée existante),
+            ajoutées au cache
+
+    Returns:
+        ({stop_area_id: StopAreaInfo} des stations valides, IDs inconnus,
+        IDs non vérifiés faute de réponse de l'API)
+    """
+    known: dict[str, StopAreaInfo] = hass.data.setdefault(DOMAIN, {}).setdefault(
+        DATA_KNOWN_STOP_AREAS, {}
+    )
+    if verified:
+        known.update(verified)
+    unknown_ids = [sid for sid in dict.fromkeys(stop_area_ids) if sid not in known]
+
+    results = await asyncio.gather(
+        *(client.async_get_stop_area(stop_area_id) for stop_area_id in unknown_ids)
+    )
+    invalid = []
+    unreachable = []
+    for stop_area_id, (stop_area, error) in zip(unknown_ids, results):
+        if error is not None:
+            unreachable.append(stop_area_id)
+            continue
+        if stop_area is None:
+            invalid.append(stop_area_id)
+            continue
+        known[stop_area_id] = StopAreaInfo(
+            name=stop_area.get("name", stop_area_id),
+            lines=tuple(
+                dict.fromkeys(
+                    line.get("code") or line.get("name", "")
+                    for line in stop_area.get("lines", [])
+                )
+            ),
+            line_ids=tuple(
+                dict.fromkeys(
+                    line["id"] for line in stop_area.get("lines", []) if line.get("id")
+                )
+            ),
+        )
+
+    return (
+        {sid: known[sid] for sid in stop_area_ids if sid in known},
+        invalid,
+        unreachable,
+    )
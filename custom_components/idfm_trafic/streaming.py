@@ -0,0 +1,129 @@
+"""Décodage progressif des réponses JSON de l'API IDFM."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+# Caractères structurants hors chaîne, et caractères spéciaux dans une chaîne
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class JSONArrayStream:
+    """
+    Extraire au fil de l'eau les objets d'un tableau JSON de premier niveau.
+
+    Le texte est fourni par morceaux via `feed`. Seuls les objets du tableau
+    `key` sont décodés (un par un, dès qu'ils sont complets) ; le reste du
+    document est parcouru sans être construit en mémoire. Le décodage
+    s'arrête dès que `limit` objets ont été extraits ou que le tableau est
+    terminé (`done` passe alors à True).
+    """
+
+    def __init__(
+        self,
+        key: str,
+        limit: int | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> None:
+        """
+        Initialisation du décodeur.
+
+        Args:
+            key: Clé de premier niveau du tableau à extraire (ex: "departures")
+            limit: Nombre maximal d'objets à extraire
+            fields: Champs à conserver dans chaque objet (tous si None)
+        """
+        self._key = key
+        self._limit = limit
+        self._fields = fields
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._in_array = False
+        self._item_start: int | None = None
+        self.items: list[dict[str, Any]] = []
+        self.done = False
+
+    def feed(self, text: str) -> None:
+        """Analyser un nouveau morceau de texte."""
+        if self.done:
+            return
+
+        buf = self._buffer + text
+        pos = self._pos
+
+        while pos < len(buf):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_key = buf[self._string_start : pos - 1]
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = len(buf)
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char in "{[":
+                if self._in_array and self._depth == 2 and char == "{":
+                    self._item_start = pos - 1
+                elif char == "[" and self._depth == 1 and self._last_key == self._key:
+                    self._in_array = True
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if not self._in_array:
+                    continue
+                if self._depth == 2 and self._item_start is not None:
+                    self._add_item(buf[self._item_start : pos])
+                    self._item_start = None
+                    if self._limit is not None and len(self.items) >= self._limit:
+                        self.done = True
+                        break
+                elif self._depth == 1:
+                    # Fin du tableau recherché
+                    self.done = True
+                    break
+
+        # Ne garder que le texte encore nécessaire (objet ou clé en cours)
+        keep = pos
+        if self._item_start is not None:
+            keep = self._item_start
+        elif self._in_string and self._depth == 1:
+            keep = self._string_start
+        self._buffer = buf[keep:]
+        self._pos = pos - keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._in_string and self._depth == 1:
+            self._string_start -= keep
+
+    def _add_item(self, raw: str) -> None:
+        """Décoder un objet complet et ne conserver que les champs utiles."""
+        item = json.loads(raw)
+        if self._fields is not None:
+            item = {field: item[field] for field in self._fields if field in item}
+        self.items.append(item)